@@ -207,6 +207,8 @@ LOGIN_LINK_SITE_URL = os.environ.get("LOGIN_SITE_URL", SITE_URL)
 TEST_RUNNER = "django_nose.NoseTestSuiteRunner"
 INSTALLED_APPS += ("django_nose",)
 TESTING = sys.argv[1:2] == ["test"]
+# There's no broker in tests, so celery tasks queued with delay() run right away
+CELERY_TASK_ALWAYS_EAGER = TESTING
 
 # Username of user Prompt will be authenticated as when using API
 PROMPT_USERNAME = os.environ.get("PROMPT_USERNAME", "prompt")
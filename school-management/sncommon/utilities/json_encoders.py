@@ -0,0 +1,17 @@
+""" JSON encoders for use with JSONField
+"""
+import orjson
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+class OrjsonEncoder(DjangoJSONEncoder):
+    """ Drop-in replacement for DjangoJSONEncoder that encodes with orjson (C), which is much faster than the
+        stdlib encoder for large payloads (i.e. digest Notification.additional_args).
+        Dates/times and any other types orjson doesn't support natively are passed to DjangoJSONEncoder.default,
+        so encoded values are identical to those produced by DjangoJSONEncoder.
+    """
+
+    def encode(self, o):
+        return orjson.dumps(
+            o, default=self.default, option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        ).decode()
@@ -65,7 +65,16 @@ class TwilioManager:
         """
         # Sets a new verificatino code on recipient! We always generate a new code before sending
         notification_recipient = notification_recipient.set_new_verification_code()
+        return self.send_verification_code(notification_recipient)
 
+    def send_verification_code(self, notification_recipient):
+        """ Text a notification recipient their CURRENT verification code (i.e. one that was set with
+            NotificationRecipient.set_new_verification_code before queueing the text)
+            Arguments:
+                notification_recipient {NotificationRecipient}
+            Returns:
+                True
+        """
         if not (settings.TESTING and not settings.TEST_TWILIO):
             self.client.messages.create(
                 from_=self.phone_number,
@@ -74,7 +83,7 @@ class TwilioManager:
             )
 
         notification_recipient.confirmation_last_sent = timezone.now()
-        notification_recipient.save()
+        notification_recipient.save(update_fields=["confirmation_last_sent"])
         return True
 
     def send_message(
@@ -105,6 +114,15 @@ class TwilioManager:
             )
         return True
 
+    @staticmethod
+    def get_message_for_notification(notification):
+        """ Text message copy for a Notification """
+        return (
+            TEXT_TEMPLATES[notification.notification_type](notification)
+            if notification.notification_type in TEXT_TEMPLATES
+            else notification.title
+        )
+
     def send_message_for_notification(self, notification, fail_silently=True):
         """ Attempt to send a text message for a Notification.
             Updates notification's texted field upon success
@@ -115,13 +133,9 @@ class TwilioManager:
             Returns:
                 Boolean indicating whether or not message was sent
         """
-        msg = (
-            TEXT_TEMPLATES[notification.notification_type](notification)
-            if notification.notification_type in TEXT_TEMPLATES
-            else notification.title
-        )
+        msg = self.get_message_for_notification(notification)
         result = self.send_message(notification.recipient, msg, fail_silently=fail_silently,)
         if result:
             notification.texted = timezone.now()
-            notification.save()
+            notification.save(update_fields=("texted", "updated"))
         return result
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-17 03:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sncounseling', '0003_counseloravailability_location'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='counselormeeting',
+            index=models.Index(condition=models.Q(('cancelled__isnull', True)), fields=['start'], name='cm_upcoming_idx'),
+        ),
+    ]
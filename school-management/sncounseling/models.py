@@ -224,6 +224,13 @@ class CounselorMeeting(SNModel):
     # Incoming FK
     # tasks > many Task
     # counselor_notes > many CounselorNote
+
+    class Meta:
+        indexes = [
+            # Upcoming meetings that haven't been cancelled (i.e. for reminders and digests)
+            models.Index(fields=["start"], condition=models.Q(cancelled__isnull=True), name="cm_upcoming_idx"),
+        ]
+
     def __str__(self):
         return f"Counselor {self.student.counselor} meeting with student {self.student} on {self.start}"
 
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-17 03:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('snmessages', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='conversationparticipant',
+            index=models.Index(fields=['active', 'phone_number'], name='cp_active_phone_number_idx'),
+        ),
+    ]
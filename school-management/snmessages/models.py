@@ -100,6 +100,10 @@ class ConversationParticipant(SNModel):
     last_read = models.DateTimeField(auto_now_add=True, blank=True)
     last_unread_message_notification = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        # Active participants for a phone number (i.e. when a NotificationRecipient's number changes)
+        indexes = [models.Index(fields=["active", "phone_number"], name="cp_active_phone_number_idx")]
+
     def __str__(self):
         return f"{self.notification_recipient.user.get_full_name()} in conversation {self.conversation}"
 
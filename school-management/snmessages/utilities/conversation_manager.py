@@ -1,3 +1,5 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from twilio.rest import Client
 from twilio.jwt.access_token import AccessToken
 from twilio.jwt.access_token.grants import ChatGrant
@@ -17,6 +19,9 @@ TEST_PARTICIPANT_ID = "testparticipant"
 TEST_CHAT_SERVICE_ID = "testchatserviceid"
 TEST_CHAT_TOKEN = "testtoken"
 
+# Max number of requests to Twilio made at once when removing many participants
+MAX_CONCURRENT_TWILIO_REQUESTS = 8
+
 
 class ConversationManagerException(Exception):
     pass
@@ -112,6 +117,43 @@ class ConversationManager:
 
         conversation_participant.delete()
 
+    def delete_conversation_participants(self, conversation_participants):
+        """ Remove many participants from their conversations (see delete_conversation_participant).
+            Twilio has no bulk delete, so Twilio ConversationParticipants are deleted concurrently, and then our
+            ConversationParticipants are deleted with one query.
+            If some Twilio deletes fail, only our participants that were removed from Twilio are deleted before
+            the (first) Twilio exception is raised
+            Arguments:
+                conversation_participants {ConversationParticipant queryset}
+            Returns: None
+        """
+        participants = list(
+            conversation_participants.filter(active=True, conversation__active=True).select_related("conversation")
+        )
+        if not participants:
+            return
+
+        errors = []
+        if settings.TEST_TWILIO or not settings.TESTING:
+
+            def delete_twilio_participant(participant):
+                self.client.conversations.conversations(participant.conversation.conversation_id).participants(
+                    participant.participant_id
+                ).delete()
+
+            with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_TWILIO_REQUESTS) as executor:
+                futures = [(x, executor.submit(delete_twilio_participant, x)) for x in participants]
+            participants = []
+            for participant, future in futures:
+                if future.exception():
+                    errors.append(future.exception())
+                else:
+                    participants.append(participant)
+
+        ConversationParticipant.objects.filter(pk__in=[x.pk for x in participants]).delete()
+        if errors:
+            raise errors[0]
+
     def deactivate_conversation(self, conversation):
         """ Delete a Twilio conversation and deactivate the associated Conversation object on our end.
             Note that this will first deactivate all conversation participants.
@@ -122,8 +164,7 @@ class ConversationManager:
         """
         if not conversation.active:
             return conversation
-        for participant in conversation.participants.filter(active=True):
-            self.delete_conversation_participant(participant)
+        self.delete_conversation_participants(conversation.participants.all())
 
         if settings.TEST_TWILIO or not settings.TESTING:
             self.client.conversations.conversations(conversation.conversation_id).delete()
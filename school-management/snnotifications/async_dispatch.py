@@ -0,0 +1,96 @@
+"""
+    Concurrent delivery of notifications, for tasks that create many notifications at once (i.e. digests).
+    Sending is almost entirely waiting on SMTP/Twilio, so instead of sending emails and texts one at a time we
+    overlap them: build notifications with generator.build_notifications, save them with
+    Notification.objects.hidden_bulk_create and then deliver them all with deliver_many.
+
+    Django's ORM isn't safe to share across threads, so everything that touches the database (rendering emails,
+    checking subscriptions, saving emailed/texted) happens on the calling thread. Only the actual sending runs in a
+    thread pool. One failed send doesn't stop the others: notifications that were delivered are still marked
+    emailed/texted before the (first) failure is raised.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List
+
+from django.utils import timezone
+from sentry_sdk import capture_exception
+
+from sncommon.utilities.twilio import TwilioManager
+from snnotifications.constants.constants import get_notification_config
+from snnotifications.generator import delivery_channels
+from snnotifications.mailer import build_email_for_notification, send_email_message
+from snnotifications.models import Notification
+
+# Max number of emails/texts being sent at once
+MAX_CONCURRENT_DELIVERIES = 20
+
+
+def _send_all(emails, texts, twilio_manager):
+    """ Send emails ([(notification, msg)]) and texts ([(notification, message)]) concurrently.
+        Returns (emailed notifications, texted notifications, exceptions raised by sends that failed)
+    """
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_DELIVERIES) as executor:
+        email_futures = [(notification, executor.submit(send_email_message, msg)) for notification, msg in emails]
+        text_futures = [
+            (notification, executor.submit(twilio_manager.send_message, notification.recipient, message))
+            for notification, message in texts
+        ]
+    emailed = []
+    texted = []
+    errors = []
+    # Emails raise if not sent (outside of production). send_message returns whether or not text was sent
+    for notification, future in email_futures:
+        if future.exception():
+            errors.append(future.exception())
+        else:
+            emailed.append(notification)
+    for notification, future in text_futures:
+        if future.exception():
+            errors.append(future.exception())
+        elif future.result():
+            texted.append(notification)
+    return emailed, texted, errors
+
+
+def deliver_many(notifications: Iterable[Notification]) -> List[Notification]:
+    """ Email and/or text saved notifications (that haven't been delivered) to their recipients, exactly as
+        create_notification would have, but sending concurrently.
+        Returns notifications, with emailed/texted updated. If any send fails, the rest are still sent (and
+        saved) before the first failure is raised
+    """
+    notifications = list(notifications)
+    emails = []
+    texts = []
+    twilio_manager = None
+    for notification in notifications:
+        email, text = delivery_channels(notification, get_notification_config(notification.notification_type))
+        if email:
+            msg = build_email_for_notification(notification)
+            if msg:
+                emails.append((notification, msg))
+        if text:
+            if not twilio_manager:
+                twilio_manager = TwilioManager()
+            texts.append((notification, twilio_manager.get_message_for_notification(notification)))
+
+    if not (emails or texts):
+        return notifications
+
+    emailed, texted, errors = _send_all(emails, texts, twilio_manager)
+    now = timezone.now()
+    delivered = {}
+    for notification in emailed:
+        notification.emailed = now
+        delivered[notification.pk] = notification
+    for notification in texted:
+        notification.texted = now
+        delivered[notification.pk] = notification
+    for notification in delivered.values():
+        notification.updated = now
+    Notification.objects.bulk_update(delivered.values(), ["emailed", "texted", "updated"])
+    if errors:
+        # Report every failure, then raise the first like create_notification would have
+        for error in errors[1:]:
+            capture_exception(error)
+        raise errors[0]
+    return notifications
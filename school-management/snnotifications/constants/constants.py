@@ -15,16 +15,21 @@
         Any key (with boolean val) that is omitted will be assumed to be False
 """
 
+from dataclasses import dataclass
+from typing import Callable, Optional, Union
+
 # Notifications that don't need a recipient
 from snnotifications.constants import notification_types
 
 
-SYSTEM_NOTIFICATIONS = [
-    "ops_paygo_payment_success",
-    "ops_paygo_payment_failure",
-    "ops_magento_webhook",
-    "ops_magento_webhook_failure",
-]
+SYSTEM_NOTIFICATIONS = frozenset(
+    {
+        "ops_paygo_payment_success",
+        "ops_paygo_payment_failure",
+        "ops_magento_webhook",
+        "ops_magento_webhook_failure",
+    }
+)
 
 # Notifications
 UNSUBSCRIBABLE_NOTIFICATIONS = {
@@ -202,20 +207,22 @@ NOTIFICATION_TYPES = {
 }
 
 # Only the following notifications get sent to users that have not accepted their invite yet
-NOTIFICATIONS_FOR_PENDING_USERS = [
-    "invite",
-    "invite_reminder",
-    "student_tutoring_session_confirmation",
-    "student_tutoring_session_cancelled",
-    "student_tutoring_session_rescheduled",
-    "tutoring_session_notes",
-    "student_tutoring_session_reminder",
-    "student_diagnostic_registration",
-    "student_diagnostic_result",
-    "diagnostic_invite",
-    "task_diagnostic",
-    "counselor_meeting_message",
-]
+NOTIFICATIONS_FOR_PENDING_USERS = frozenset(
+    {
+        "invite",
+        "invite_reminder",
+        "student_tutoring_session_confirmation",
+        "student_tutoring_session_cancelled",
+        "student_tutoring_session_rescheduled",
+        "tutoring_session_notes",
+        "student_tutoring_session_reminder",
+        "student_diagnostic_registration",
+        "student_diagnostic_result",
+        "diagnostic_invite",
+        "task_diagnostic",
+        "counselor_meeting_message",
+    }
+)
 
 # For notifications that don't have overriding settings in NOTIFICATION_TYPES
 DEFAULT = {
@@ -234,6 +241,64 @@ def get_notification_config(notification_type):
     return NOTIFICATION_TYPES.get(notification_type, DEFAULT)
 
 
+# Notification types that never have a notification created for parent and are never texted (most of them).
+# Note types not in NOTIFICATION_TYPES use DEFAULT, which cc's parent
+SIMPLE_NOTIFICATION_TYPES = frozenset(
+    notification_type
+    for notification_type, config in NOTIFICATION_TYPES.items()
+    if not config.get("cc_parent") and not config.get("default_text")
+)
+
+
+@dataclass(frozen=True)
+class NotificationMeta:
+    """ Everything needed to generate the copy for a notification type: its title generator (format string or
+        function, see generator.TITLE_GENERATORS) and, if it appears in the activity log, its activity log title and
+        description functions. Built for every type by generator.NOTIFICATION_META
+    """
+
+    __slots__ = ("title_generator", "activity_log_title_function", "activity_log_description_function")
+    title_generator: Union[str, Callable]
+    activity_log_title_function: Optional[Callable]
+    activity_log_description_function: Optional[Callable]
+
+
+# Relations to select_related when fetching Notification.related_object for a notification type. Title generators
+# (and email templates) for these types traverse these relations, so we fetch them with the related object.
+RELATED_FETCH_HINTS = {
+    # CounselorMeeting
+    "counselor_meeting_message": ["student__counselor__user"],
+    "student_counselor_meeting_confirmed": ["student__counselor"],
+    "student_counselor_meeting_rescheduled": ["student__counselor"],
+    "student_counselor_meeting_cancelled": ["student__counselor"],
+    "student_counselor_session_reminder": ["student__counselor"],
+    "counselor_counselor_meeting_confirmed": ["student"],
+    "counselor_counselor_meeting_rescheduled": ["student"],
+    "counselor_counselor_session_reminder": ["student"],
+    # StudentTutoringSession
+    "individual_tutoring_session_tutor": ["student"],
+    "student_tutoring_session_reminder": ["student"],
+    "tutor_tutoring_session_reminder": ["student", "individual_session_tutor"],
+    "student_tutoring_session_cancelled": ["group_tutoring_session", "individual_session_tutor"],
+    "student_tutoring_session_rescheduled": ["group_tutoring_session", "individual_session_tutor"],
+    "tutor_tutoring_session_cancelled": ["group_tutoring_session", "student"],
+    "tutor_tutoring_session_rescheduled": ["group_tutoring_session", "student"],
+    "ops_paygo_payment_success": ["student"],
+    "ops_paygo_payment_failure": ["student"],
+    # Task
+    "task_complete": ["for_user"],
+    "student_self_assigned_diagnostic": ["for_user"],
+    # DiagnosticResult
+    "diagnostic_result": ["student__user", "diagnostic"],
+    "diagnostic_result_pending_return": ["student__user", "diagnostic"],
+    "student_diagnostic_result": ["diagnostic"],
+    "counselor_diagnostic_result": ["student", "diagnostic"],
+    "diagnostic_score_required": ["student", "diagnostic"],
+    "diagnostic_recommendation_required": ["student", "diagnostic"],
+    # FileUpload
+    "counselor_file_upload": ["counseling_student"],
+}
+
 # Reminder frequency for various notifications (minutes)
 NOTIFICATION_TUTORING_SESSION_REMINDER = [48 * 60]
 NOTIFICATION_COUNSELOR_MEETING_REMINDER = [48 * 60]
@@ -8,17 +8,34 @@
             derivative Notification objects)
         - Set the title (subject) and description
 """
+from functools import lru_cache
+from typing import List, Tuple
+
 import pytz
 from django.conf import settings
 from snnotifications.constants import notification_types
 from snnotifications.models import Notification, NotificationModelManager, NotificationRecipient
 from snnotifications.activity_log_descriptions import ACTIVITY_LOG_DESCRIPTION_FUNCTIONS, ACTIVITY_LOG_TITLE_FUNCTIONS
-from snnotifications.constants.constants import get_notification_config, SYSTEM_NOTIFICATIONS
+from snnotifications.constants.constants import (
+    get_notification_config,
+    NotificationMeta,
+    SIMPLE_NOTIFICATION_TYPES,
+    SYSTEM_NOTIFICATIONS,
+)
 from snnotifications.mailer import send_email_for_notification
 from sncommon.utilities.twilio import TwilioManager
 from snusers.models import get_cw_user
 
-# Functions that return (title) email subject, given notification key
+
+@lru_cache(maxsize=128)
+def _tz(name):
+    """ Memoized pytz.timezone, since reminder titles are generated in bulk by nightly tasks """
+    return pytz.timezone(name)
+
+
+# Title (email subject) generators, given notification key. Each generator is either a format string that is
+# rendered with the notification as x (i.e. "Task: {x.related_object.title}"), or a function that takes the
+# notification and returns its title. Prefer format strings; use a function only if title needs logic.
 # Oh hey - while you're here: If users need to be able to turn off a notification, make sure you add it to
 # UNSUBSCRIBABLE_NOTIFICATIONS in constants
 
@@ -28,83 +45,199 @@ def title_generator_unread_messages(notification):
     display_name = notification.related_object.conversation_with_name
 
     if not display_name:
-        raise ValueError(f"Unable to determine title for notification {notification.pk}")
+        raise ValueError(f"Unable to determine title for notification {notification.slug}")
     return f"[UMS] New messages in your conversation with {display_name}"
 
 
 TITLE_GENERATORS = {
     "invite": lambda x: f"Create your account on {settings.SITE_NAME}!",
     "invite_reminder": lambda x: f"Reminder: Create your account on {settings.SITE_NAME}!",
-    "task": lambda x: f"Task: {x.related_object.title}",
-    "cas_magento_student_created": lambda x: f"New student created: {x.related_object.name}",
-    "cap_magento_student_created": lambda x: f"New student in UMS: {x.related_object.name}",
+    "task": "Task: {x.related_object.title}",
+    "cas_magento_student_created": "New student created: {x.related_object.name}",
+    "cap_magento_student_created": "New student in UMS: {x.related_object.name}",
     "user_accepted_invite": lambda x: f"{x.related_object.get_full_name()} has accepted their invite to UMS",
     "diagnostic_result": lambda x: f"{x.related_object.student.user.get_full_name()}'s {x.related_object.diagnostic.title} has been submitted",
     "diagnostic_result_pending_return": lambda x: f"{x.related_object.student.user.get_full_name()}'s {x.related_object.diagnostic.title} evaluation is pending return",
-    "task_diagnostic": lambda x: f"Task: Complete {x.related_object.title} diagnostic",
+    "task_diagnostic": "Task: Complete {x.related_object.title} diagnostic",
     "task_complete": lambda x: f"{x.related_object.for_user.get_full_name()}'s {x.related_object.title} is now Complete",
     "student_self_assigned_diagnostic": lambda x: f"Self Assigned Diagnostic: {x.related_object.for_user.get_full_name()} self-assigned {x.related_object.title} diagnostic",
-    "individual_tutoring_session_tutor": lambda x: f"{x.related_object.student.name} has scheduled an individual tutoring session",
+    "individual_tutoring_session_tutor": "{x.related_object.student.name} has scheduled an individual tutoring session",
     "tutoring_session_notes": lambda x: f"Notes complete on tutoring session: {x.related_object.group_tutoring_session.title if x.related_object.group_tutoring_session else x.related_object.individual_session_tutor.name} on {x.related_object.start.strftime('%b %d')}",
-    "student_tutoring_session_confirmation": lambda x: f"Confirmed: Tutoring session",
+    "student_tutoring_session_confirmation": "Confirmed: Tutoring session",
     "student_tutoring_session_cancelled": lambda x: f"Cancelled tutoring session: {x.related_object.group_tutoring_session.title if x.related_object.group_tutoring_session else x.related_object.individual_session_tutor.name} on {x.related_object.start.strftime('%b %d')}",
     "tutor_tutoring_session_cancelled": lambda x: f"Cancelled tutoring session: {x.related_object.group_tutoring_session.title if x.related_object.group_tutoring_session else x.related_object.student.name} on {x.related_object.start.strftime('%b %d')}",
     "student_tutoring_session_rescheduled": lambda x: f"Rescheduled tutoring session: {x.related_object.group_tutoring_session.title if x.related_object.group_tutoring_session else x.related_object.individual_session_tutor.name}",
-    "tutor_daily_digest": lambda x: f"Daily Tutoring Digest",
+    "tutor_daily_digest": "Daily Tutoring Digest",
     "tutor_tutoring_session_rescheduled": lambda x: f"Rescheduled tutoring session: {x.related_object.group_tutoring_session.title if x.related_object.group_tutoring_session else x.related_object.student.name}",
-    "tutor_tutoring_session_reminder": lambda x: f"Reminder: Tutoring session with {x.related_object.student.name} - {x.related_object.start.astimezone(pytz.timezone(x.related_object.individual_session_tutor.timezone)).strftime('%b %d %-I:%M%p')}",
-    "tutor_gts_reminder": lambda x: f"Reminder: Group tutoring session ({x.related_object.title}) - {x.related_object.start.astimezone(pytz.timezone(x.recipient.user.tutor.timezone)).strftime('%b %d')}",
-    "group_tutoring_session_cancelled": lambda x: f"Cancelled tutoring session: {x.related_object.title}",
+    "tutor_tutoring_session_reminder": lambda x: f"Reminder: Tutoring session with {x.related_object.student.name} - {x.related_object.start.astimezone(_tz(x.related_object.individual_session_tutor.timezone)).strftime('%b %d %-I:%M%p')}",
+    "tutor_gts_reminder": lambda x: f"Reminder: Group tutoring session ({x.related_object.title}) - {x.related_object.start.astimezone(_tz(x.recipient.user.tutor.timezone)).strftime('%b %d')}",
+    "group_tutoring_session_cancelled": "Cancelled tutoring session: {x.related_object.title}",
     "task_digest": lambda x: f"New Task{'s' if len(x.additional_args) > 1 else ''}: {len(x.additional_args)} new task{'s' if len(x.additional_args) > 1 else ''} has been assigned to you in UMS",
-    "student_tutoring_session_reminder": lambda x: f"Reminder: Tutoring session - {x.related_object.start.astimezone(pytz.timezone(x.related_object.student.timezone)).strftime('%b %d')}",
-    "package_purchase_confirmation": lambda x: f"Confirmed: Schoolnet tutoring package {x.related_object.tutoring_package.title}",
-    "student_diagnostic_result": lambda x: f"Your {x.related_object.diagnostic.title} diagnostic has been reviewed",
-    "counselor_diagnostic_result": lambda x: f"{x.related_object.student.name}'s {x.related_object.diagnostic.title} diagnostic has been reviewed",
-    "diagnostic_score_required": lambda x: f"{x.related_object.student.name}'s {x.related_object.diagnostic.title} diagnostic needs to be scored",
-    "diagnostic_recommendation_required": lambda x: f"{x.related_object.student.name}'s {x.related_object.diagnostic.title} diagnostic is scored and requires recommendation",
-    "student_student_low_on_hours": lambda x: f"[UMS] Running low on hours",
+    "student_tutoring_session_reminder": lambda x: f"Reminder: Tutoring session - {x.related_object.start.astimezone(_tz(x.related_object.student.timezone)).strftime('%b %d')}",
+    "package_purchase_confirmation": "Confirmed: Schoolnet tutoring package {x.related_object.tutoring_package.title}",
+    "student_diagnostic_result": "Your {x.related_object.diagnostic.title} diagnostic has been reviewed",
+    "counselor_diagnostic_result": "{x.related_object.student.name}'s {x.related_object.diagnostic.title} diagnostic has been reviewed",
+    "diagnostic_score_required": "{x.related_object.student.name}'s {x.related_object.diagnostic.title} diagnostic needs to be scored",
+    "diagnostic_recommendation_required": "{x.related_object.student.name}'s {x.related_object.diagnostic.title} diagnostic is scored and requires recommendation",
+    "student_student_low_on_hours": "[UMS] Running low on hours",
     "tutor_altered_availability": lambda x: f"{x.related_object.name} altered their availability for the week of {x.additional_args['start_date'].strftime('%b %d')}",
-    "course_enrollment_confirmation": lambda x: f"{x.related_object.name} course enrollment confirmed",
-    "course_unenrollment_confirmation": lambda x: f"Unenrolled from course {x.related_object.name}",
-    "tutor_time_card": lambda x: f"New time card created ({x.related_object.start.strftime('%m/%d/%Y')} - {x.related_object.end.strftime('%m/%d/%Y')})",
-    "student_counselor_meeting_confirmed": lambda x: f"Meeting scheduled with {x.related_object.student.counselor.name} on {x.related_object.start.astimezone(pytz.timezone(x.related_object.student.timezone)).strftime('%b %d')}",
-    "counselor_counselor_meeting_confirmed": lambda x: f"Meeting scheduled with {x.related_object.student.name} on {x.related_object.start.astimezone(pytz.timezone(x.related_object.student.timezone)).strftime('%b %d')}",
-    "student_counselor_meeting_rescheduled": lambda x: f"Meeting scheduled with {x.related_object.student.counselor.name} rescheduled to {x.related_object.start.astimezone(pytz.timezone(x.related_object.student.timezone)).strftime('%b %d')}",
-    "counselor_counselor_meeting_rescheduled": lambda x: f"Meeting scheduled with {x.related_object.student.name} rescheduled to {x.related_object.start.astimezone(pytz.timezone(x.related_object.student.timezone)).strftime('%b %d')}",
-    "student_counselor_meeting_cancelled": lambda x: f"Cancelled: Meeting with {x.related_object.student.counselor.name} on {x.related_object.start.astimezone(pytz.timezone(x.related_object.student.timezone)).strftime('%b %d')}",
-    "student_counselor_session_reminder": lambda x: f"Reminder: Meeting scheduled with {x.related_object.student.counselor.name} on {x.related_object.start.astimezone(pytz.timezone(x.related_object.student.timezone)).strftime('%b %d')}",
-    "counselor_counselor_session_reminder": lambda x: f"Reminder: Meeting scheduled with {x.related_object.student.name} on {x.related_object.start.astimezone(pytz.timezone(x.related_object.student.timezone)).strftime('%b %d')}",
-    "counselor_weekly_digest": lambda x: f"Counselor Weekly Digest",
-    "ops_upcoming_course": lambda x: f"Upcoming Course: {x.related_object.verbose_name}",
-    "first_individual_tutoring_session_daily_digest": lambda x: f"Individual Tutoring Session Report",
+    "course_enrollment_confirmation": "{x.related_object.name} course enrollment confirmed",
+    "course_unenrollment_confirmation": "Unenrolled from course {x.related_object.name}",
+    "tutor_time_card": "New time card created ({x.related_object.start:%m/%d/%Y} - {x.related_object.end:%m/%d/%Y})",
+    "student_counselor_meeting_confirmed": lambda x: f"Meeting scheduled with {x.related_object.student.counselor.name} on {x.related_object.start.astimezone(_tz(x.related_object.student.timezone)).strftime('%b %d')}",
+    "counselor_counselor_meeting_confirmed": lambda x: f"Meeting scheduled with {x.related_object.student.name} on {x.related_object.start.astimezone(_tz(x.related_object.student.timezone)).strftime('%b %d')}",
+    "student_counselor_meeting_rescheduled": lambda x: f"Meeting scheduled with {x.related_object.student.counselor.name} rescheduled to {x.related_object.start.astimezone(_tz(x.related_object.student.timezone)).strftime('%b %d')}",
+    "counselor_counselor_meeting_rescheduled": lambda x: f"Meeting scheduled with {x.related_object.student.name} rescheduled to {x.related_object.start.astimezone(_tz(x.related_object.student.timezone)).strftime('%b %d')}",
+    "student_counselor_meeting_cancelled": lambda x: f"Cancelled: Meeting with {x.related_object.student.counselor.name} on {x.related_object.start.astimezone(_tz(x.related_object.student.timezone)).strftime('%b %d')}",
+    "student_counselor_session_reminder": lambda x: f"Reminder: Meeting scheduled with {x.related_object.student.counselor.name} on {x.related_object.start.astimezone(_tz(x.related_object.student.timezone)).strftime('%b %d')}",
+    "counselor_counselor_session_reminder": lambda x: f"Reminder: Meeting scheduled with {x.related_object.student.name} on {x.related_object.start.astimezone(_tz(x.related_object.student.timezone)).strftime('%b %d')}",
+    "counselor_weekly_digest": "Counselor Weekly Digest",
+    "ops_upcoming_course": "Upcoming Course: {x.related_object.verbose_name}",
+    "first_individual_tutoring_session_daily_digest": "Individual Tutoring Session Report",
     "unread_messages": title_generator_unread_messages,
-    "student_diagnostic_registration": lambda x: "Comfirmed: Diagnostic Registration",
-    "ops_student_diagnostic_registration": lambda x: f"Diagnostic Registration: {x.related_object}",
-    "recommend_diagnostic": lambda x: f"You have been assigned a diagnostic to evaluate",
-    "score_diagnostic": lambda x: f"You have been assigned a diagnostic to score",
-    "ops_failed_charge": lambda x: "Failed credit card charge attempt",
-    "diagnostic_invite": lambda x: "You have been invited to take a diagnostic with Schoolnet",
-    "ops_magento_webhook": lambda x: f"Incoming webhook from Magento",
-    "ops_magento_webhook_failure": lambda x: f"Incoming webhook from Magento FAILED",
-    "registration_success": lambda x: "Confirmed: Successful registration",
-    "ops_paygo_payment_success": lambda x: f"Automatic paygo payment successful for {x.related_object.student}'s session: {x.related_object.title_for_student}",
-    "ops_paygo_payment_failure": lambda x: f"Automatic paygo payment failed for {x.related_object.student}'s session: {x.related_object.title_for_student}",
+    "student_diagnostic_registration": "Comfirmed: Diagnostic Registration",
+    "ops_student_diagnostic_registration": "Diagnostic Registration: {x.related_object}",
+    "recommend_diagnostic": "You have been assigned a diagnostic to evaluate",
+    "score_diagnostic": "You have been assigned a diagnostic to score",
+    "ops_failed_charge": "Failed credit card charge attempt",
+    "diagnostic_invite": "You have been invited to take a diagnostic with Schoolnet",
+    "ops_magento_webhook": "Incoming webhook from Magento",
+    "ops_magento_webhook_failure": "Incoming webhook from Magento FAILED",
+    "registration_success": "Confirmed: Successful registration",
+    "ops_paygo_payment_success": "Automatic paygo payment successful for {x.related_object.student}'s session: {x.related_object.title_for_student}",
+    "ops_paygo_payment_failure": "Automatic paygo payment failed for {x.related_object.student}'s session: {x.related_object.title_for_student}",
     "last_meeting": lambda x: f"{len(x.additional_args['students'])} students have their last session in the next week"
     if len(x.additional_args["students"]) != 1
     else f"1 student has their last session on {x.additional_args['date']}",
-    "counselor_file_upload": lambda x: f"New file upload ({x.related_object.title}) for your student {x.related_object.counseling_student}",
+    "counselor_file_upload": "New file upload ({x.related_object.title}) for your student {x.related_object.counseling_student}",
     "counselor_meeting_message": lambda x: x.related_object.notes_message_subject
     if x.related_object.notes_message_subject
     else f"{x.related_object.student.counselor.user.first_name} has added notes from your meeting ({x.related_object.title})",
-    notification_types.BULLETIN: lambda x: f"[Schoolnet] {x.related_object.title}",
+    notification_types.BULLETIN: "[Schoolnet] {x.related_object.title}",
     notification_types.COUNSELOR_TASK_DIGEST: lambda x: f"UMS Digest: Upcoming and Overdue Student Tasks ({len(x.additional_args)})",
-    notification_types.STUDENT_TASK_REMINDER: lambda x: f"Overdue and Upcoming tasks in UMS",
+    notification_types.STUDENT_TASK_REMINDER: "Overdue and Upcoming tasks in UMS",
     notification_types.COUNSELOR_FORWARD_STUDENT_MESSAGE: lambda x: f"New message from {x.additional_args['author']}",
     notification_types.COUNSELOR_COMPLETED_TASKS: lambda x: f"UMS Digest: Recently completed tasks ({len(x.additional_args)})",
-    notification_types.INDIVIDUAL_TASK_REMINDER: lambda x: f"Task Reminder: {x.related_object.title}",
+    notification_types.INDIVIDUAL_TASK_REMINDER: "Task Reminder: {x.related_object.title}",
 }
 
 
+# TITLE_GENERATORS and activity log functions fused, so one lookup gets everything needed to generate a notification's
+# copy
+NOTIFICATION_META = {
+    notification_type: NotificationMeta(
+        title_generator,
+        ACTIVITY_LOG_TITLE_FUNCTIONS.get(notification_type),
+        ACTIVITY_LOG_DESCRIPTION_FUNCTIONS.get(notification_type),
+    )
+    for notification_type, title_generator in TITLE_GENERATORS.items()
+}
+
+
+def render_title(title_generator, notification):
+    """ Render a TITLE_GENERATORS entry (format string or function) for notification """
+    if isinstance(title_generator, str):
+        return title_generator.format(x=notification)
+    return title_generator(notification)
+
+
+# Notification types whose title depends on the notification's recipient (and not just the related object)
+RECIPIENT_DEPENDENT_TITLES = frozenset({"unread_messages", "tutor_gts_reminder"})
+
+
+def _get_notification_recipient(user) -> NotificationRecipient:
+    """ Get (or create if it doesn't exist) NotificationRecipient for user """
+    # pylint: disable=unused-variable
+    # Active users almost always have a recipient already, so avoid get_or_create's savepoint when we can.
+    # If callers select_related("notification_recipient") on user, this issues no query at all
+    try:
+        return user.notification_recipient
+    except NotificationRecipient.DoesNotExist:
+        (notification_recipient, created_recipient,) = NotificationRecipient.objects.get_or_create(user=user)
+        return notification_recipient
+
+
+def _set_title_fields(notification: Notification, meta: NotificationMeta):
+    """ Set title and (if notification type appears in activity log) activity log title and description, using
+        meta (the notification type's NOTIFICATION_META entry)
+    """
+    notification.title = render_title(meta.title_generator, notification)
+    # Add deets for activity log
+    if meta.activity_log_title_function:
+        notification.activity_log_title = meta.activity_log_title_function(notification)
+    if meta.activity_log_description_function:
+        notification.activity_log_description = meta.activity_log_description_function(notification)
+
+
+def delivery_channels(notification: Notification, config: dict) -> Tuple[bool, bool]:
+    """ Whether notification should be (emailed, texted) to its recipient, based on their subscriptions """
+    if not notification.recipient:
+        return False, False
+    email_unsubscribed, text_unsubscribed = notification.recipient.subscription_sets
+    return (
+        notification.notification_type not in email_unsubscribed and notification.recipient.receive_emails,
+        bool(config.get("default_text")) and notification.notification_type not in text_unsubscribed,
+    )
+
+
+def _emit_single(notification: Notification, config: dict) -> Notification:
+    """ Save a notification that has its title set, and then email and/or text it to its recipient (if they are
+        subscribed). System notifications (no recipient) are only saved.
+    """
+    # Notification is built (not created) by create_notification so that it is persisted with a single INSERT
+    notification.save()
+
+    email, text = delivery_channels(notification, config)
+    if email:
+        send_email_for_notification(notification)
+    if text:
+        mgr = TwilioManager()
+        mgr.send_message_for_notification(notification)
+
+    # No need to refresh; the send helpers set emailed/texted on this instance
+    return notification
+
+
+def _build_notifications(user, **kwargs) -> Tuple[List[Notification], dict]:
+    """ Build (unsaved, titles set) the notification described by create_notification's arguments and any
+        notifications created alongside it (i.e. for a parent). Returns (notifications, notification type's config)
+    """
+    if user:
+        notification_recipients = [_get_notification_recipient(user)]
+    elif kwargs.get("notification_type") not in SYSTEM_NOTIFICATIONS:
+        raise ValueError(f"Recipient required for notification of type {kwargs.get('notification_type')}")
+    else:
+        notification_recipients = [None]
+
+    meta = NOTIFICATION_META.get(kwargs.get("notification_type"))
+    if meta is None:
+        raise ValueError(f"Notification {kwargs.get('notification_type')} has no title generator")
+    config = get_notification_config(kwargs.get("notification_type"))
+
+    # If recipient is a student who won't be emailed this notification but their parent is to be cc'd, then the
+    # parent gets their own notification (instead of being cc'd on the student's email)
+    student_recipient = notification_recipients[0]
+    if student_recipient and config.get("cc_parent"):
+        email_unsubscribed, _ = student_recipient.subscription_sets
+        if kwargs["notification_type"] in email_unsubscribed or not student_recipient.receive_emails:
+            cw_user = get_cw_user(user)
+            if cw_user.user_type == "student" and cw_user.parent:
+                notification_recipients.append(_get_notification_recipient(cw_user.parent.user))
+
+    notifications = []
+    for notification_recipient in notification_recipients:
+        notification: Notification = Notification.objects.hidden_build(recipient=notification_recipient, **kwargs)
+        if notifications and notification.notification_type not in RECIPIENT_DEPENDENT_TITLES:
+            # Title and activity log don't depend on recipient, so we reuse those generated for first recipient
+            notification.title = notifications[0].title
+            notification.activity_log_title = notifications[0].activity_log_title
+            notification.activity_log_description = notifications[0].activity_log_description
+        else:
+            _set_title_fields(notification, meta)
+        notifications.append(notification)
+    return notifications, config
+
+
 def create_notification(user, **kwargs):
     """
         Oh man this is exciting. This is the sole function responsible for creating all notifications. Notifications
@@ -122,53 +255,30 @@ def create_notification(user, **kwargs):
                 USER CAN BE NONE. If it is then it's assumed we're creating a system notification
             kwargs: Should map to fields on Notification (actual keyword args not dict)
     """
-    # pylint: disable=unused-variable
-    if user:
-        (notification_recipient, created_recipient,) = NotificationRecipient.objects.get_or_create(user=user)
-        notification: Notification = Notification.objects.hidden_create(recipient=notification_recipient, **kwargs)
-    elif kwargs.get("notification_type") not in SYSTEM_NOTIFICATIONS:
-        raise ValueError(f"Recipient required for notification of type {kwargs.get('notification_type')}")
-    else:
-        notification: Notification = Notification.objects.hidden_create(**kwargs)
-
-    if notification.notification_type not in TITLE_GENERATORS:
-        raise ValueError(f"Notification {notification.notification_type} has no title generator")
-
-    notification.title = TITLE_GENERATORS[notification.notification_type](notification)
-    # Add deets for activity log
-    if notification.notification_type in ACTIVITY_LOG_TITLE_FUNCTIONS:
-        notification.activity_log_title = ACTIVITY_LOG_TITLE_FUNCTIONS[notification.notification_type](notification)
-    if notification.notification_type in ACTIVITY_LOG_DESCRIPTION_FUNCTIONS:
-        notification.activity_log_description = ACTIVITY_LOG_DESCRIPTION_FUNCTIONS[notification.notification_type](
-            notification
+    meta = NOTIFICATION_META.get(kwargs.get("notification_type"))
+    if user and meta and kwargs["notification_type"] in SIMPLE_NOTIFICATION_TYPES:
+        # Fast path for the common case: a single recipient, who may be emailed but is never texted
+        notification: Notification = Notification.objects.hidden_build(
+            recipient=_get_notification_recipient(user), **kwargs
         )
-    notification.save()
-
-    if not notification.recipient:
+        _set_title_fields(notification, meta)
+        notification.save()
+        email_unsubscribed, _ = notification.recipient.subscription_sets
+        if notification.notification_type not in email_unsubscribed and notification.recipient.receive_emails:
+            send_email_for_notification(notification)
         return notification
 
-    # Determine whether or not notification needs to be emailed
-    if (
-        notification.notification_type not in notification.recipient.unsubscribed_email_notifications
-        and notification.recipient.receive_emails
-    ):
-        send_email_for_notification(notification)
+    notifications, config = _build_notifications(user, **kwargs)
+    for notification in notifications:
+        _emit_single(notification, config)
+    return notifications[0]
 
-    elif get_notification_config(notification.notification_type).get("cc_parent"):
-        cw_user = get_cw_user(notification.recipient.user)
-        if cw_user.user_type == "student" and cw_user.parent:
-            # There is a parent who would be cc'd, but student has unsubscribed. So we create separate
-            # notification for parent
-            create_notification(cw_user.parent.user, **kwargs)
-
-    # Determine whether or not notification needs to be texted
-    if (
-        get_notification_config(notification.notification_type).get("default_text")
-        and notification.notification_type not in notification.recipient.unsubscribed_text_notifications
-    ):
-        mgr = TwilioManager()
-        mgr.send_message_for_notification(notification)
 
-    # Refresh to make sure we have updated emailed/texted field
-    notification.refresh_from_db()
-    return notification
+def build_notifications(user, **kwargs) -> List[Notification]:
+    """ Like create_notification, but notifications are only built: they're neither saved nor emailed/texted. Returns
+        all notifications (notification for user first, followed by any for i.e. their parent).
+        Use to create many notifications at once: save them all with Notification.objects.hidden_bulk_create and then
+        deliver them concurrently with async_dispatch.deliver_many
+    """
+    notifications, _ = _build_notifications(user, **kwargs)
+    return notifications
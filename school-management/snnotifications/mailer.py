@@ -5,7 +5,7 @@
     https://github.com/michaelhelmick/python-mailsnake
 """
 from datetime import timedelta
-from typing import Tuple
+from typing import Optional, Tuple
 
 from django.conf import settings
 from django.core import mail
@@ -335,16 +335,15 @@ ATTACHMENT_GENERATORS = {"tutoring_session_notes": get_tutoring_session_notes}
 CC_PARENT_ON_STUDENT_NOTIFICATIONS = ["task_diagnostic"]
 
 
-def send_email_for_notification(notification: Notification, resend=True, force_test=False):
+def build_email_for_notification(
+    notification: Notification, resend=True, force_test=False
+) -> Optional[mail.EmailMultiAlternatives]:
     """
-        Send an email for a Notification object.
+        Build (but don't send) the email for a Notification object.
     Arguments:
-            notification {Notification}
-            resend {Boolean} Will resend notifications that have already been sent (default)
-                unless this is set to False
-            force_test {Bolean} If True we will send email to test address, even if env is prod
+            See send_email_for_notification
         Returns:
-            Boolean indicating whether or not email was sent
+            EmailMultiAlternatives, or None if no email should be sent for notification
     """
     if not notification.recipient:
         raise ValueError(f"Cannot send notification without recipient (noti {notification.slug})")
@@ -354,14 +353,14 @@ def send_email_for_notification(notification: Notification, resend=True, force_t
         template_name = TEMPLATE_NAME_GETTERS[notification.notification_type](notification)
     template_file = f"snnotifications/email_templates/{template_name}.html"
     if notification.emailed and not resend:
-        return False
+        return None
     if not notification.recipient.receive_emails:
-        return False
+        return None
     if (
         not notification.recipient.user.has_usable_password()
         and notification.notification_type not in NOTIFICATIONS_FOR_PENDING_USERS
     ):
-        return False
+        return None
     # We attempt to get copy for email
     try:
         cw_user = get_cw_user(notification.recipient.user)
@@ -441,15 +440,37 @@ def send_email_for_notification(notification: Notification, resend=True, force_t
                 msg.attach(
                     filename=attachment_content_file.name, content=attachment_content_file.read(), mimetype=mime,
                 )
-
-        if settings.ENV == "production":
-            msg.send(fail_silently=True)
-        else:
-            msg.send(fail_silently=False)
-
-        notification.emailed = timezone.now()
-        notification.save()
-        return True
+        return msg
     except TemplateDoesNotExist as exc:
         print(f"Email template does not exist: {template_name}", exc)
+        return None
+
+
+def send_email_message(msg: mail.EmailMultiAlternatives):
+    """ Send an email built by build_email_for_notification. Doesn't touch the database, so is safe to call from
+        another thread
+    """
+    if settings.ENV == "production":
+        msg.send(fail_silently=True)
+    else:
+        msg.send(fail_silently=False)
+
+
+def send_email_for_notification(notification: Notification, resend=True, force_test=False):
+    """
+        Send an email for a Notification object.
+    Arguments:
+            notification {Notification}
+            resend {Boolean} Will resend notifications that have already been sent (default)
+                unless this is set to False
+            force_test {Bolean} If True we will send email to test address, even if env is prod
+        Returns:
+            Boolean indicating whether or not email was sent
+    """
+    msg = build_email_for_notification(notification, resend=resend, force_test=force_test)
+    if msg is None:
         return False
+    send_email_message(msg)
+    notification.emailed = timezone.now()
+    notification.save(update_fields=("emailed", "updated"))
+    return True
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.5 on 2026-10-17 02:33
+
+from django.db import migrations, models
+import sncommon.utilities.json_encoders
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('snnotifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='additional_args',
+            field=models.JSONField(default=dict, encoder=sncommon.utilities.json_encoders.OrjsonEncoder),
+        ),
+        migrations.AlterField(
+            model_name='notificationrecipient',
+            name='unsubscribed_email_notifications',
+            field=models.JSONField(default=list, encoder=sncommon.utilities.json_encoders.OrjsonEncoder),
+        ),
+        migrations.AlterField(
+            model_name='notificationrecipient',
+            name='unsubscribed_text_notifications',
+            field=models.JSONField(default=list, encoder=sncommon.utilities.json_encoders.OrjsonEncoder),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.5 on 2026-10-17 02:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('snnotifications', '0002_alter_notification_additional_args_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('read', False)), fields=['recipient', 'read'], name='nf_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('emailed__isnull', True)), fields=['recipient'], name='nf_unemailed_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-17 03:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('snnotifications', '0003_notification_partial_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('notification_type', 'ops_upcoming_course')), fields=['related_object_pk'], name='nf_ops_upcoming_course_idx'),
+        ),
+    ]
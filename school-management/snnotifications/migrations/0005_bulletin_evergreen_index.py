@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-17 03:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('snnotifications', '0004_notification_upcoming_course_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bulletin',
+            index=models.Index(condition=models.Q(('evergreen', True)), fields=['created_by', 'evergreen_expiration'], name='bulletin_evergreen_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-17 03:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('snnotifications', '0005_bulletin_evergreen_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('activity_log_title', ''), _negated=True), fields=['recipient', '-created'], name='nf_activity_log_idx'),
+        ),
+    ]
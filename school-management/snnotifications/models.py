@@ -1,13 +1,14 @@
-import random
+import secrets
 from django.contrib.postgres.fields.array import ArrayField
 
 from django.db import models
 from django.db.models import JSONField
 from django.contrib.contenttypes.models import ContentType
-from django.core.serializers.json import DjangoJSONEncoder
 from django.core.exceptions import ObjectDoesNotExist
 
 from sncommon.model_base import SNModel
+from sncommon.utilities.json_encoders import OrjsonEncoder
+from snnotifications.constants.constants import RELATED_FETCH_HINTS
 
 
 class NotificationModelManager(models.Manager):
@@ -24,6 +25,25 @@ class NotificationModelManager(models.Manager):
         """ Hide ORM create() """
         return super(NotificationModelManager, self).create(*args, **kwargs)
 
+    def hidden_bulk_create(self, objs, batch_size=500):
+        """ Hide ORM bulk_create(). Returns objs (with pks set) """
+        return super(NotificationModelManager, self).bulk_create(objs, batch_size=batch_size)
+
+    def hidden_build(self, *args, **kwargs):
+        """ Construct a Notification without saving it, so that the generator can set title and activity log
+            fields before the single INSERT
+        """
+        return self.model(*args, **kwargs)
+
+
+class NotificationLeanManager(NotificationModelManager):
+    """ Defers the (potentially long) description fields, which are only needed for the activity log.
+        Use for notifications that are checked/dispatched rather than displayed
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().defer("description", "activity_log_description")
+
 
 class Notification(SNModel):
     """  A notification about some action or message in the platform """
@@ -84,38 +104,77 @@ class Notification(SNModel):
     secondary_related_object_pk = models.IntegerField(null=True, blank=True)
 
     # In addition, non-database objects may be supplied
-    additional_args = JSONField(encoder=DjangoJSONEncoder, default=dict)
+    additional_args = JSONField(encoder=OrjsonEncoder, default=dict)
 
     # Custom model manager (hide create)
     objects = NotificationModelManager()
+    lean = NotificationLeanManager()
+
+    class Meta:
+        # Partial indexes for unread/unsent notifications. The vast majority of notifications are eventually
+        # read and emailed, so these stay small
+        indexes = [
+            models.Index(fields=["recipient", "read"], condition=models.Q(read=False), name="nf_unread_idx"),
+            models.Index(fields=["recipient"], condition=models.Q(emailed__isnull=True), name="nf_unemailed_idx"),
+            # Courses we've already sent upcoming course notifications for (send_upcoming_course)
+            models.Index(
+                fields=["related_object_pk"],
+                condition=models.Q(notification_type="ops_upcoming_course"),
+                name="nf_ops_upcoming_course_idx",
+            ),
+            # Most recent notifications in a user's activity log (ActivityLogView). Only notifications with an
+            # activity log title show up there
+            models.Index(
+                fields=["recipient", "-created"],
+                condition=~models.Q(activity_log_title=""),
+                name="nf_activity_log_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.title} emailed: {self.emailed}  texted: {self.texted}"
 
-    # Properties to assist in getting related objects
-    @property
-    def related_object(self):
-        if self.related_object_content_type and self.related_object_pk:
+    def refresh_from_db(self, *args, **kwargs):
+        """ Also drop cached related objects, as Django does for its own relation caches """
+        super().refresh_from_db(*args, **kwargs)
+        self.__dict__.pop("_related_object_cache", None)
+
+    def _get_generic_related_object(self, content_type_id, pk, select_related=None):
+        """ Fetch a generic related object, caching it on this instance by (content type, pk) so that title
+            generators and email templates can access related objects repeatedly without querying again.
+            Content type is looked up by ID through ContentType's process-wide cache, instead of through the FK
+            (which would query django_content_type for every notification loaded from the db)
+        """
+        if not (content_type_id and pk):
+            return None
+        cache = self.__dict__.setdefault("_related_object_cache", {})
+        key = (content_type_id, pk)
+        if key not in cache:
+            queryset = ContentType.objects.get_for_id(content_type_id).model_class()._base_manager.all()
+            if select_related:
+                queryset = queryset.select_related(*select_related)
             try:
-                related_object = self.related_object_content_type.get_object_for_this_type(pk=self.related_object_pk)
-                return related_object
+                cache[key] = queryset.get(pk=pk)
             except ObjectDoesNotExist:
                 # Oh that's okay
-                pass
-        return None
+                cache[key] = None
+        return cache[key]
+
+    # Properties to assist in getting related objects
+    @property
+    def related_object(self):
+        """ Relations listed in RELATED_FETCH_HINTS for this notification type are fetched with the object """
+        return self._get_generic_related_object(
+            self.related_object_content_type_id,
+            self.related_object_pk,
+            select_related=RELATED_FETCH_HINTS.get(self.notification_type),
+        )
 
     @property
     def secondary_related_object(self):
-        if self.secondary_related_object_content_type and self.secondary_related_object_pk:
-            try:
-                related_object = self.secondary_related_object_content_type.get_object_for_this_type(
-                    pk=self.secondary_related_object_pk
-                )
-                return related_object
-            except ObjectDoesNotExist:
-                # Oh that's okay
-                pass
-        return None
+        return self._get_generic_related_object(
+            self.secondary_related_object_content_type_id, self.secondary_related_object_pk
+        )
 
 
 class NotificationRecipient(SNModel):
@@ -134,8 +193,8 @@ class NotificationRecipient(SNModel):
     receive_emails = models.BooleanField(default=True)
 
     # Arrays of notification types that user is UNSUBSCRIBED from
-    unsubscribed_email_notifications = JSONField(encoder=DjangoJSONEncoder, default=list)
-    unsubscribed_text_notifications = JSONField(encoder=DjangoJSONEncoder, default=list)
+    unsubscribed_email_notifications = JSONField(encoder=OrjsonEncoder, default=list)
+    unsubscribed_text_notifications = JSONField(encoder=OrjsonEncoder, default=list)
 
     """ Incoming FK """
     # participants > many ConversationParticipant
@@ -143,9 +202,24 @@ class NotificationRecipient(SNModel):
     def __str__(self):
         return f"Notification Recipient for {self.user.get_full_name()}"
 
+    @property
+    def phone_number_is_confirmed(self):
+        return bool(self.phone_number_confirmed)
+
+    @property
+    def subscription_sets(self):
+        """ (unsubscribed email notification types, unsubscribed text notification types) as frozensets, for O(1)
+            membership checks when generating notifications. Built from the current lists every time, so they
+            can't go stale
+        """
+        return (
+            frozenset(self.unsubscribed_email_notifications),
+            frozenset(self.unsubscribed_text_notifications),
+        )
+
     def set_new_verification_code(self):
         """ Sets a new verification code (self.verification_code) """
-        self.phone_number_verification_code = "".join([str(random.randint(1, 9)) for x in range(5)])
+        self.phone_number_verification_code = "".join(secrets.SystemRandom().choices("123456789", k=5))
         self.phone_number_confirmed = None
         self.save()
         return self
@@ -203,6 +277,14 @@ class Bulletin(SNModel):
 
     class Meta:
         ordering = ["-created"]
+        indexes = [
+            # Evergreen bulletins (by their creator) for new students and parents. Few bulletins are evergreen
+            models.Index(
+                fields=["created_by", "evergreen_expiration"],
+                condition=models.Q(evergreen=True),
+                name="bulletin_evergreen_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.title
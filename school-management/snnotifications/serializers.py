@@ -1,6 +1,7 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
-from django.db.models import Func, F
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import F
 
 from sncommon.serializers.base import AdminCounselorModelSerializer, AdminModelSerializer
 from sncommon.serializers.file_upload import UpdateFileUploadsSerializer
@@ -9,17 +10,30 @@ from snnotifications.constants.constants import UNSUBSCRIBABLE_NOTIFICATIONS
 from snmessages.models import ConversationParticipant
 
 
-from snusers.models import Parent, Student, get_cw_user
+from snusers.models import Parent, Student
 
 CAP_STUDENT = "cap_student"
 CAS_STUDENT = "cas_student"
 
+# User's (one to one) relations to each type of cw user, in the order get_cw_user checks them
+CW_USER_RELATIONS = ("administrator", "counselor", "tutor", "parent", "student")
+
+# Notifications students can unsubscribe from, keyed on (is_cap, is_cas). Computed once since they never change
+STUDENT_UNSUBSCRIBABLE_NOTIFICATIONS = {
+    (True, False): tuple(dict.fromkeys(UNSUBSCRIBABLE_NOTIFICATIONS[CAP_STUDENT])),
+    (False, True): tuple(dict.fromkeys(UNSUBSCRIBABLE_NOTIFICATIONS[CAS_STUDENT])),
+    (True, True): tuple(
+        dict.fromkeys(UNSUBSCRIBABLE_NOTIFICATIONS[CAP_STUDENT] + UNSUBSCRIBABLE_NOTIFICATIONS[CAS_STUDENT])
+    ),
+    (False, False): (),
+}
+
 
 class NotificationRecipientSerializer(AdminModelSerializer):
     """ Serializer for - you guessed it - NotificationRecipient objects """
 
     # We just return whether or not phone number is confirmed, but not when. READ ONLY
-    phone_number_is_confirmed = serializers.SerializerMethodField()
+    phone_number_is_confirmed = serializers.BooleanField(read_only=True)
     user = serializers.PrimaryKeyRelatedField(read_only=True)
 
     # Number of conversations with unread messages
@@ -45,40 +59,57 @@ class NotificationRecipientSerializer(AdminModelSerializer):
             "unread_conversations",
         ) + admin_fields
 
-    def get_phone_number_is_confirmed(self, obj):
-        return bool(obj.phone_number_confirmed)
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # cw user for each user (pk) this serializer has serialized a recipient for. Lives as long as the
+        # serializer does (i.e. one request) so it can't go stale
+        self._cw_users = {}
+
+    def validate_phone_number(self, value):
+        """ Phone numbers are stored as digits only (country code and number), so they can be matched exactly """
+        return "".join(x for x in value if x.isdigit())
 
     def get_unread_conversations(self, obj):
-        participants = ConversationParticipant.objects.filter(
-            notification_recipient=obj, conversation__last_message__isnull=False
-        ).annotate(duration=Func(F("last_read"), F("conversation__last_message"), function="age"))
-        return len(
-            [x for x in participants if hasattr(x, "duration") and x.duration and x.duration.total_seconds() < 0]
-        )
+        # Annotated by NotificationRecipientViewset's queryset
+        if hasattr(obj, "unread_conversations"):
+            return obj.unread_conversations
+        # Conversations with a message since participant last read
+        return ConversationParticipant.objects.filter(
+            notification_recipient=obj,
+            conversation__last_message__isnull=False,
+            last_read__lt=F("conversation__last_message"),
+        ).count()
+
+    def _get_cw_user(self, obj):
+        """ Same as get_cw_user(obj.user), but uses the user's cw user relations so that no queries are needed when
+            they've been selected (as NotificationRecipientViewset does). Cached per user on the serializer
+        """
+        if obj.user_id not in self._cw_users:
+            self._cw_users[obj.user_id] = None
+            for relation in CW_USER_RELATIONS:
+                try:
+                    self._cw_users[obj.user_id] = getattr(obj.user, relation)
+                    break
+                except ObjectDoesNotExist:
+                    pass
+        return self._cw_users[obj.user_id]
 
     def get_unsubscribable_notifications(self, obj):
-        cw_user = get_cw_user(obj.user)
+        cw_user = self._get_cw_user(obj)
         if not cw_user:
             return []
         if isinstance(cw_user, Student):
             # We separate CAS and CAP notifications
-            notis = []
-            if cw_user.is_cap:
-                notis += UNSUBSCRIBABLE_NOTIFICATIONS[CAP_STUDENT]
-            if cw_user.is_cas:
-                notis += UNSUBSCRIBABLE_NOTIFICATIONS[CAS_STUDENT]
-            return list(set(notis))
+            return STUDENT_UNSUBSCRIBABLE_NOTIFICATIONS[(bool(cw_user.is_cap), bool(cw_user.is_cas))]
 
-        return (
-            UNSUBSCRIBABLE_NOTIFICATIONS[cw_user.user_type] if cw_user.user_type in UNSUBSCRIBABLE_NOTIFICATIONS else []
-        )
+        return UNSUBSCRIBABLE_NOTIFICATIONS.get(cw_user.user_type, [])
 
 
 class NotificationSerializer(serializers.ModelSerializer):
     """ Serializes a notification (surprise). Primarily used to display activity log
     """
 
-    actor_name = serializers.SerializerMethodField()
+    actor_name = serializers.CharField(source="actor.get_full_name", read_only=True, default="")
 
     class Meta:
         model = Notification
@@ -98,9 +129,6 @@ class NotificationSerializer(serializers.ModelSerializer):
             "related_object_pk",
         )
 
-    def get_actor_name(self, obj: Notification):
-        return obj.actor.get_full_name() if obj.actor else ""
-
 
 class BulletinSerializer(UpdateFileUploadsSerializer, AdminCounselorModelSerializer):
     # Used by UpdateFileUploadsSerializer
@@ -167,6 +195,9 @@ class BulletinSerializer(UpdateFileUploadsSerializer, AdminCounselorModelSeriali
         )
 
     def get_read_student_names(self, obj: Bulletin):
+        # Use read_student_recipients if it was prefetched by BulletinViewset (ordered by invitation_name)
+        if hasattr(obj, "read_student_recipients"):
+            return list(dict.fromkeys(x.user.student.invitation_name for x in obj.read_student_recipients))
         return (
             Student.objects.filter(user__notification_recipient__read_bulletins=obj)
             .order_by("invitation_name")
@@ -175,6 +206,8 @@ class BulletinSerializer(UpdateFileUploadsSerializer, AdminCounselorModelSeriali
         )
 
     def get_read_parent_names(self, obj: Bulletin):
+        if hasattr(obj, "read_parent_recipients"):
+            return list(dict.fromkeys(x.user.parent.invitation_name for x in obj.read_parent_recipients))
         return (
             Parent.objects.filter(user__notification_recipient__read_bulletins=obj)
             .order_by("invitation_name")
@@ -1,10 +1,11 @@
 import json
+from collections import defaultdict
 from datetime import timedelta
 from celery import shared_task
 from django.utils import timezone
-from django.db.models import Q, F
+from django.db.models import Q, F, Prefetch, Exists, OuterRef
 from django.contrib.contenttypes.models import ContentType
-from sentry_sdk import configure_scope, capture_exception
+from sentry_sdk import push_scope, capture_exception
 
 from snnotifications.constants.constants import (
     NOTIFICATION_TUTORING_SESSION_REMINDER,
@@ -12,8 +13,10 @@ from snnotifications.constants.constants import (
     INVITE_FIRST_REMINDER,
     INVITE_PERIODIC_REMINDER,
 )
-from snnotifications.models import Notification
-from snnotifications.generator import create_notification
+from snnotifications.models import Notification, NotificationRecipient
+from snnotifications.async_dispatch import deliver_many
+from snnotifications.generator import build_notifications, create_notification
+from sncommon.utilities.twilio import TwilioManager
 from sntasks.models import Task
 from sntutoring.models import StudentTutoringSession, GroupTutoringSession, Course
 from sncounseling.models import CounselorMeeting
@@ -31,82 +34,103 @@ TUTOR_DAILY_DIGEST_NOTIFICATION = "tutor_daily_digest"
 FIRST_INDIVIDUAL_TUTORING_SESSION_DAILY_DIGEST = "first_individual_tutoring_session_daily_digest"
 
 
+def _reminder_windows(reminders):
+    """ Reminder windows for a list of reminder times (minutes), longest first, as
+        (reminder timedelta, next shorter reminder timedelta or None) pairs.
+        An event starting before the next shorter reminder gets that reminder instead
+    """
+    reminders = [timedelta(minutes=x) for x in sorted(reminders, reverse=True)]
+    return tuple(zip(reminders, reminders[1:] + [None]))
+
+
+# Reminder constants don't change, so work out their windows once
+TUTORING_SESSION_REMINDER_WINDOWS = _reminder_windows(NOTIFICATION_TUTORING_SESSION_REMINDER)
+COUNSELOR_MEETING_REMINDER_WINDOWS = _reminder_windows(NOTIFICATION_COUNSELOR_MEETING_REMINDER)
+
+
 @shared_task
 def send_upcoming_tutoring_notification():
     """ Send notifications to students and tutors about upcoming tutoring sessions
         Returns lists of all StudentTutoringSessions and GroupTutoringSessions that noti was
             sent for
     """
-    sorted_reminders = NOTIFICATION_TUTORING_SESSION_REMINDER
-    sorted_reminders.sort(reverse=True)
+    now = timezone.now()
+    sts_content_type = ContentType.objects.get_for_model(StudentTutoringSession)
+    gts_content_type = ContentType.objects.get_for_model(GroupTutoringSession)
     # Keep track of PKs of StudentTutoringSession and GroupTutoringSessions we send noti for
     all_sts = []
     all_gts = []
-    for idx, x in enumerate(sorted_reminders):
+    for reminder, next_reminder in TUTORING_SESSION_REMINDER_WINDOWS:
+        # Sessions that start within reminder, but not within the next (shorter) reminder
+        lower = now + next_reminder if next_reminder else now
+        upper = now + reminder
         sessions = (
             StudentTutoringSession.objects.filter(
                 missed=False,
                 set_cancelled=False,
-                start__lte=timezone.now() + timedelta(minutes=x),
-                start__gt=timezone.now(),
+                start__lte=upper,
+                start__gte=lower,
+                start__gt=now,
                 is_tentative=False,
             )
             .exclude(group_tutoring_session__cancelled=True)
-            .filter(Q(last_reminder_sent=None) | Q(last_reminder_sent__lt=F("start") - timedelta(minutes=x)))
+            .filter(Q(last_reminder_sent=None) | Q(last_reminder_sent__lt=F("start") - reminder))
+            .select_related(
+                "student__user__notification_recipient", "individual_session_tutor__user__notification_recipient"
+            )
         )
         group_sessions = (
-            GroupTutoringSession.objects.filter(
-                cancelled=False, start__lte=timezone.now() + timedelta(minutes=x), start__gt=timezone.now(),
-            )
-            .filter(Q(last_reminder_sent=None) | Q(last_reminder_sent__lt=F("start") - timedelta(minutes=x)))
+            GroupTutoringSession.objects.filter(cancelled=False, start__lte=upper, start__gte=lower, start__gt=now)
+            .filter(Q(last_reminder_sent=None) | Q(last_reminder_sent__lt=F("start") - reminder))
             .distinct()
+            .select_related("primary_tutor__user__notification_recipient")
+            .prefetch_related(
+                Prefetch("support_tutors", queryset=Tutor.objects.select_related("user__notification_recipient"))
+            )
         )
-        if len(NOTIFICATION_TUTORING_SESSION_REMINDER) > idx + 1:
-            sessions = sessions.filter(start__gte=(timezone.now() + timedelta(minutes=sorted_reminders[idx + 1])))
-            group_sessions = sessions.filter(start__gte=timezone.now() + timedelta(minutes=sorted_reminders[idx + 1]))
-        else:
-            sessions = sessions.filter(start__gte=timezone.now())
-            group_sessions = group_sessions.filter(start__gte=timezone.now())
 
+        # Evaluate once, loading only the columns we use (related objects were selected above)
+        sessions = list(sessions.only("pk", "student", "individual_session_tutor"))
+        notifications = []
         for session in sessions:
             # Notify student and notify tutor
-            session.last_reminder_sent = timezone.now()
-            session.save()
-            create_notification(
+            notifications += build_notifications(
                 session.student.user,
-                **{
-                    "notification_type": STUDENT_TUTORING_SESSION_NOTIFICATION,
-                    "related_object_content_type": ContentType.objects.get_for_model(StudentTutoringSession),
-                    "related_object_pk": session.pk,
-                },
+                notification_type=STUDENT_TUTORING_SESSION_NOTIFICATION,
+                related_object_content_type=sts_content_type,
+                related_object_pk=session.pk,
             )
             if session.individual_session_tutor:
-                create_notification(
+                notifications += build_notifications(
                     session.individual_session_tutor.user,
-                    **{
-                        "notification_type": TUTOR_TUTORING_SESSION_NOTIFICATION,
-                        "related_object_content_type": ContentType.objects.get_for_model(StudentTutoringSession),
-                        "related_object_pk": session.pk,
-                    },
+                    notification_type=TUTOR_TUTORING_SESSION_NOTIFICATION,
+                    related_object_content_type=sts_content_type,
+                    related_object_pk=session.pk,
                 )
 
+        group_sessions = list(group_sessions.only("pk", "primary_tutor"))
         for group_session in group_sessions:
             # Notify primary and support tutors
-            group_session.last_reminder_sent = timezone.now()
-            group_session.save()
-            tutors = Tutor.objects.filter(
-                Q(primary_group_tutoring_sessions=group_session) | Q(support_group_tutoring_sessions=group_session)
-            ).distinct()
-            for tutor in tutors:
-                create_notification(
+            # Primary and support tutors were fetched with the session; a tutor could (but shouldn't) be both
+            tutors = {x.pk: x for x in [group_session.primary_tutor, *group_session.support_tutors.all()] if x}
+            for tutor in tutors.values():
+                notifications += build_notifications(
                     tutor.user,
                     notification_type=TUTOR_GTS_NOTIFICATION,
-                    related_object_content_type=ContentType.objects.get_for_model(GroupTutoringSession),
+                    related_object_content_type=gts_content_type,
                     related_object_pk=group_session.pk,
                 )
 
-        all_sts += [x.pk for x in sessions]
-        all_gts += [x.pk for x in group_sessions]
+        sts_pks = [x.pk for x in sessions]
+        gts_pks = [x.pk for x in group_sessions]
+        # Mark reminders as sent with one UPDATE per model, before sending (so one failed send doesn't get everyone
+        # in this window reminded again) and before we move on to the next, shorter, reminder window
+        StudentTutoringSession.objects.filter(pk__in=sts_pks).update(last_reminder_sent=now, updated=now)
+        GroupTutoringSession.objects.filter(pk__in=gts_pks).update(last_reminder_sent=now, updated=now)
+        # Raises (after sending everything else) if any send fails, so this must stay after the UPDATEs above
+        deliver_many(Notification.objects.hidden_bulk_create(notifications))
+        all_sts += sts_pks
+        all_gts += gts_pks
 
     return {"sts": all_sts, "gts": all_gts}
 
@@ -120,42 +144,40 @@ def send_upcoming_counselor_meeting_notification():
         STUDENT_COUNSELOR_MEETING_NOTIFICATION
         COUNSELOR_COUNSELOR_MEETING_NOTIFICATION
     """
-    sorted_reminders = NOTIFICATION_COUNSELOR_MEETING_REMINDER
-    sorted_reminders.sort(reverse=True)
+    now = timezone.now()
+    meeting_content_type = ContentType.objects.get_for_model(CounselorMeeting)
 
     all_meetings = []
-    for idx, reminder_time_threshold in enumerate(sorted_reminders):
-        meetings = CounselorMeeting.objects.filter(
-            cancelled=None,
-            start__lte=timezone.now() + timedelta(minutes=reminder_time_threshold),
-            start__gt=timezone.now(),
-        ).filter(
-            Q(last_reminder_sent=None)
-            | Q(last_reminder_sent__lt=F("start") - timedelta(minutes=reminder_time_threshold))
+    for reminder, _ in COUNSELOR_MEETING_REMINDER_WINDOWS:
+        meetings = CounselorMeeting.objects.filter(cancelled=None, start__lte=now + reminder, start__gt=now).filter(
+            Q(last_reminder_sent=None) | Q(last_reminder_sent__lt=F("start") - reminder)
         )
+        meetings = list(meetings.select_related("student__user__notification_recipient").only("pk", "title", "student"))
 
+        reminded_meeting_pks = []
         for meeting in meetings:
             try:
                 create_notification(
                     meeting.student.user,
                     **{
                         "notification_type": STUDENT_COUNSELOR_MEETING_NOTIFICATION,
-                        "related_object_content_type": ContentType.objects.get_for_model(CounselorMeeting),
+                        "related_object_content_type": meeting_content_type,
                         "related_object_pk": meeting.pk,
                     },
                 )
-                meeting.last_reminder_sent = timezone.now()
-                meeting.save()
+                reminded_meeting_pks.append(meeting.pk)
             except Exception as err:
                 # A rare case where we want to catch a general exception so that one notification failing to send
-                # doesn't ruin this for everyone. Log the issue
-                with configure_scope() as scope:
+                # doesn't ruin this for everyone. Log the issue (in its own scope, so the meeting's context doesn't
+                # stick around for the rest of the task)
+                with push_scope() as scope:
                     scope.set_context(
                         "Meeting Data",
                         {"meeting ID": meeting.pk, "student ID": meeting.student.pk, "title": meeting.title},
                     )
                     scope.set_tag("Celery Task", "Send upcoming counselor meeting notification")
                     capture_exception(err)
+        CounselorMeeting.objects.filter(pk__in=reminded_meeting_pks).update(last_reminder_sent=now, updated=now)
         all_meetings += [x.pk for x in meetings]
 
     return {"meetings": all_meetings}
@@ -172,47 +194,39 @@ def send_tutor_availability_required():
 @shared_task
 def send_invite_reminder():
     """ Send reminder to users who are ACTIVE and pending invitation """
+    now = timezone.now()
+    # Whether user has been sent an invite/invite reminder. EXISTS subqueries so we don't need to join (and then
+    # dedupe) every one of the user's notifications
+    invite_sent = Exists(Notification.objects.filter(recipient__user=OuterRef("user"), notification_type="invite"))
+    invite_reminder_sent = Exists(
+        Notification.objects.filter(recipient__user=OuterRef("user"), notification_type="invite_reminder")
+    )
     # Time Query
     # First reminder is due, or it's time for periodic reminder
-    first_reminder_due = Q(
-        Q(created__lte=timezone.now() - timedelta(minutes=INVITE_FIRST_REMINDER))
-        & ~Q(user__notification_recipient__notifications__notification_type="invite_reminder")
-    )
-    periodic_reminder_due = Q(last_invited__lt=timezone.now() - timedelta(minutes=INVITE_PERIODIC_REMINDER))
+    first_reminder_due = Q(created__lte=now - timedelta(minutes=INVITE_FIRST_REMINDER)) & ~invite_reminder_sent
+    periodic_reminder_due = Q(last_invited__lt=now - timedelta(minutes=INVITE_PERIODIC_REMINDER))
 
-    students = (
-        Student.objects.filter(
-            accepted_invite=None, user__notification_recipient__notifications__notification_type="invite",
-        )
-        .filter(first_reminder_due | periodic_reminder_due)
-        .distinct()
+    students = Student.objects.filter(invite_sent, accepted_invite=None).filter(
+        first_reminder_due | periodic_reminder_due
     )
-    tutors = (
-        Tutor.objects.filter(
-            accepted_invite=None, user__notification_recipient__notifications__notification_type="invite",
-        )
-        .filter(first_reminder_due | periodic_reminder_due)
-        .distinct()
-    )
-    parents = (
-        Parent.objects.filter(
-            accepted_invite=None, user__notification_recipient__notifications__notification_type="invite",
-        )
-        .filter(first_reminder_due | periodic_reminder_due)
-        .distinct()
+    tutors = Tutor.objects.filter(invite_sent, accepted_invite=None).filter(first_reminder_due | periodic_reminder_due)
+    parents = Parent.objects.filter(invite_sent, accepted_invite=None).filter(
+        first_reminder_due | periodic_reminder_due
     )
     # Evaluate our querysets so we can return them properly
     students = list(students)
     tutors = list(tutors)
     parents = list(parents)
     all_cw_users = students + tutors + parents
+    notifications = []
     for cwuser in all_cw_users:
         user = cwuser.user
         if not user.has_usable_password():
             # We send a reminder!
-            cwuser.last_invited = timezone.now()
+            cwuser.last_invited = now
             cwuser.save()
-            create_notification(user, notification_type="invite_reminder")
+            notifications += build_notifications(user, notification_type="invite_reminder")
+    deliver_many(Notification.objects.hidden_bulk_create(notifications))
     return {
         "students": [x.pk for x in students],
         "parents": [x.pk for x in parents],
@@ -225,19 +239,22 @@ def send_tutor_daily_digest():
     """
     A daily summary email of session- and conversation-related info for Tutors.
     """
-    tutors = Tutor.objects.all()
+    tutors = Tutor.objects.select_related("user__notification_recipient").only("pk", "user")
+    tutor_content_type = ContentType.objects.get_for_model(Tutor)
 
     tutors_sent_digests = []
-    for tutor in tutors:
-        create_notification(
+    notifications = []
+    for tutor in tutors.iterator(chunk_size=500):
+        notifications += build_notifications(
             tutor.user,
             **{
                 "notification_type": TUTOR_DAILY_DIGEST_NOTIFICATION,
-                "related_object_content_type": ContentType.objects.get_for_model(Tutor),
+                "related_object_content_type": tutor_content_type,
                 "related_object_pk": tutor.pk,
             },
         )
         tutors_sent_digests.append(tutor.pk)
+    deliver_many(Notification.objects.hidden_bulk_create(notifications))
 
     return tutors_sent_digests
 
@@ -246,38 +263,44 @@ def send_tutor_daily_digest():
 def send_upcoming_course():
     """ Notification to ops/admin of upcoming course
     """
+    now = timezone.now()
     # Courses with session in the next week, but not before, and no notification sent for
-    notified_courses = (
+    notified_course_ids = set(
         Notification.objects.filter(notification_type="ops_upcoming_course")
-        .distinct()
+        .order_by("related_object_pk")
+        .distinct("related_object_pk")
         .values_list("related_object_pk", flat=True)
     )
 
-    courses = (
+    courses = list(
         Course.objects.filter(
-            group_tutoring_sessions__start__gt=timezone.now(),
-            group_tutoring_sessions__start__lt=timezone.now() + timedelta(days=7),
+            group_tutoring_sessions__start__gt=now,
+            group_tutoring_sessions__start__lt=now + timedelta(days=7),
             group_tutoring_sessions__cancelled=False,
         )
-        .exclude(group_tutoring_sessions__start__lt=timezone.now(), group_tutoring_sessions__cancelled=False,)
-        .exclude(pk__in=notified_courses)
+        .exclude(group_tutoring_sessions__start__lt=now, group_tutoring_sessions__cancelled=False,)
+        .exclude(pk__in=notified_course_ids)
         .distinct()
+        # We only need name (for verbose_name)
+        .only("pk", "name")
     )
 
     admins = Administrator.objects.all()
-    return_courses = list(courses)
+    course_content_type = ContentType.objects.get_for_model(Course)
+    notifications = []
     for course in courses:
         for admin in admins:
-            create_notification(
+            notifications += build_notifications(
                 admin.user,
                 notification_type="ops_upcoming_course",
-                related_object_content_type=ContentType.objects.get_for_model(Course),
+                related_object_content_type=course_content_type,
                 related_object_pk=course.pk,
             )
+    deliver_many(Notification.objects.hidden_bulk_create(notifications))
 
     return {
-        "courses": [x.pk for x in return_courses],
-        "display": [x.verbose_name for x in return_courses],
+        "courses": [x.pk for x in courses],
+        "display": [x.verbose_name for x in courses],
     }
 
 
@@ -288,20 +311,24 @@ def send_first_individual_tutoring_session_daily_digest():
     that took place in the last 24 hours and that were the student's first session
     Returns list of notification PKS that were sent
     """
-    admins = Administrator.objects.all()
+    admins = Administrator.objects.select_related("user__notification_recipient").only("pk", "user")
+    admin_content_type = ContentType.objects.get_for_model(Administrator)
 
     notis = []
-    for admin in admins:
-        noti = create_notification(
+    notifications = []
+    for admin in admins.iterator(chunk_size=500):
+        admin_notifications = build_notifications(
             admin.user,
             **{
                 "notification_type": FIRST_INDIVIDUAL_TUTORING_SESSION_DAILY_DIGEST,
-                "related_object_content_type": ContentType.objects.get_for_model(Administrator),
+                "related_object_content_type": admin_content_type,
                 "related_object_pk": admin.pk,
             },
         )
-        notis.append(noti.pk)
-    return json.dumps(notis)
+        notis.append(admin_notifications[0])
+        notifications += admin_notifications
+    deliver_many(Notification.objects.hidden_bulk_create(notifications))
+    return json.dumps([x.pk for x in notis])
 
 
 @shared_task
@@ -312,20 +339,38 @@ def send_counselor_weekly_digest():
     If no upcoming meetings, no email(s) sent.
     """
     now = timezone.now()
-    upcoming_meetings = CounselorMeeting.objects.filter(start__gte=now, start__lte=now + timedelta(days=7))
-    counselor_sent_digest = []
+    # Upcoming meeting PKs for each counselor (with upcoming meetings), all in one query
+    meetings_by_counselor = defaultdict(list)
+    upcoming_meetings = CounselorMeeting.objects.filter(
+        start__gte=now, start__lte=now + timedelta(days=7), cancelled=None, student__counselor__isnull=False
+    ).values_list("pk", "student__counselor")
+    for meeting_pk, counselor_pk in upcoming_meetings:
+        meetings_by_counselor[counselor_pk].append(meeting_pk)
 
-    for counselor in Counselor.objects.all():
-        meetings = upcoming_meetings.filter(student__counselor=counselor).filter(cancelled=None)
-        if meetings:
-            create_notification(
-                counselor.user,
-                **{
-                    "notification_type": COUNSELOR_WEEKLY_DIGEST_NOTIFICATION,
-                    "related_object_content_type": ContentType.objects.get_for_model(Counselor),
-                    "related_object_pk": counselor.pk,
-                    "additional_args": list(meetings.values_list("pk", flat=True)),
-                },
-            )
-            counselor_sent_digest.append(counselor.pk)
+    counselor_sent_digest = []
+    notifications = []
+    counselors = Counselor.objects.filter(pk__in=meetings_by_counselor.keys()).select_related(
+        "user__notification_recipient"
+    )
+    counselor_content_type = ContentType.objects.get_for_model(Counselor)
+    for counselor in counselors.only("pk", "user").iterator(chunk_size=500):
+        notifications += build_notifications(
+            counselor.user,
+            **{
+                "notification_type": COUNSELOR_WEEKLY_DIGEST_NOTIFICATION,
+                "related_object_content_type": counselor_content_type,
+                "related_object_pk": counselor.pk,
+                "additional_args": meetings_by_counselor[counselor.pk],
+            },
+        )
+        counselor_sent_digest.append(counselor.pk)
+    deliver_many(Notification.objects.hidden_bulk_create(notifications))
     return counselor_sent_digest
+
+
+@shared_task
+def send_phone_number_verification(notification_recipient_pk):
+    """ Text a NotificationRecipient the verification code that was set on them by the request that asked for it
+        (TwilioManager.send_verification_code)
+    """
+    TwilioManager().send_verification_code(NotificationRecipient.objects.get(pk=notification_recipient_pk))
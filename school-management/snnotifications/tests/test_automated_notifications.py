@@ -18,42 +18,48 @@ from snnotifications.tasks import (
     send_invite_reminder,
     send_first_individual_tutoring_session_daily_digest,
     send_upcoming_counselor_meeting_notification,
+    send_counselor_weekly_digest,
+    send_upcoming_tutoring_notification,
 )
 from sntasks.models import Task
 from sncounseling.models import CounselorMeeting
 from sncounseling.utilities.counselor_meeting_manager import CounselorMeetingManager
 from sntutoring.models import StudentTutoringSession, GroupTutoringSession, Location
 from sntutoring.utilities.tutoring_package_manager import StudentTutoringPackagePurchaseManager
-from snusers.models import Student, Tutor, Parent, Administrator, Counselor
+from snusers.models import Student, Tutor, Administrator, Counselor
 from snusers.serializers.users import StudentSerializer
 
 
 class TestTaskNotifications(TestCase):
     fixtures = ("fixture.json",)
 
-    def setUp(self):
-        self.now = timezone.now()
-        self.admin = Administrator.objects.first()
-        self.tutor = Tutor.objects.first()
-        self.counselor = Counselor.objects.first()
-        self.student = Student.objects.first()
-        self.task = Task.objects.create(for_user=self.student.user, title="Test Task", due=timezone.now())
-        self.meeting_1 = CounselorMeeting.objects.create(student=self.student, created_by=self.counselor.user)
-        self.meeting_2 = CounselorMeeting.objects.create(student=self.student, created_by=self.counselor.user)
-        self.group_session = GroupTutoringSession.objects.create(
-            primary_tutor=self.tutor,
+    @classmethod
+    def setUpTestData(cls):
+        cls.now = timezone.now()
+        cls.admin = Administrator.objects.first()
+        cls.tutor = Tutor.objects.first()
+        cls.counselor = Counselor.objects.first()
+        cls.student = Student.objects.first()
+        cls.task = Task.objects.create(for_user=cls.student.user, title="Test Task", due=timezone.now())
+        cls.meeting_1, cls.meeting_2 = CounselorMeeting.objects.bulk_create(
+            [CounselorMeeting(student=cls.student, created_by=cls.counselor.user) for _ in range(2)]
+        )
+        cls.group_session = GroupTutoringSession.objects.create(
+            primary_tutor=cls.tutor,
             title="group_session",
             location=Location.objects.create(name="Example Location"),
-            start=self.now,
-        )
-        self.individual_sts = StudentTutoringSession.objects.create(
-            individual_session_tutor=self.tutor, student=self.student, start=self.now
+            start=cls.now,
         )
-        self.group_sts = StudentTutoringSession.objects.create(
-            student=self.student, group_tutoring_session=self.group_session, start=self.group_session.start,
+        cls.individual_sts, cls.group_sts = StudentTutoringSession.objects.bulk_create(
+            [
+                StudentTutoringSession(individual_session_tutor=cls.tutor, student=cls.student, start=cls.now),
+                StudentTutoringSession(
+                    student=cls.student, group_tutoring_session=cls.group_session, start=cls.group_session.start,
+                ),
+            ]
         )
-        self.student.counselor = self.counselor
-        self.student.save()
+        cls.student.counselor = cls.counselor
+        cls.student.save()
 
     def test_sending_tutors_daily_digest_emails(self):
         """ python manage.py test snnotifications.tests.test_automated_notifications:TestTaskNotifications.test_sending_tutors_daily_digest_emails """
@@ -101,6 +107,47 @@ class TestTaskNotifications(TestCase):
         mtg_pks = result["meetings"]
         self.assertEqual(len(mtg_pks), 0)
 
+    def test_upcoming_tutoring_notification(self):
+        # Sessions (individual and group) in the next 48 hours get a reminder
+        for session in (self.group_session, self.individual_sts, self.group_sts):
+            session.start = self.now + timedelta(hours=2)
+            session.save()
+        result = send_upcoming_tutoring_notification()
+        self.assertEqual(set(result["sts"]), {self.individual_sts.pk, self.group_sts.pk})
+        self.assertEqual(result["gts"], [self.group_session.pk])
+        self.assertTrue(
+            Notification.objects.filter(
+                notification_type="tutor_gts_reminder",
+                recipient__user=self.tutor.user,
+                related_object_pk=self.group_session.pk,
+            ).exists()
+        )
+        self.group_session.refresh_from_db()
+        self.assertIsNotNone(self.group_session.last_reminder_sent)
+
+        # Reminders were already sent
+        result = send_upcoming_tutoring_notification()
+        self.assertEqual(result, {"sts": [], "gts": []})
+
+    def test_counselor_weekly_digest(self):
+        # No upcoming meetings. No digest
+        self.assertEqual(send_counselor_weekly_digest(), [])
+
+        # Meeting in the next week (and one after) - digest only includes the upcoming meeting
+        self.meeting_1.start = self.now + timedelta(days=2)
+        self.meeting_1.save()
+        self.meeting_2.start = self.now + timedelta(days=8)
+        self.meeting_2.save()
+        self.assertEqual(send_counselor_weekly_digest(), [self.counselor.pk])
+        noti = Notification.objects.get(notification_type="counselor_weekly_digest")
+        self.assertEqual(noti.recipient.user, self.counselor.user)
+        self.assertEqual(noti.additional_args, [self.meeting_1.pk])
+
+        # Cancelled meetings aren't included
+        self.meeting_1.cancelled = self.now
+        self.meeting_1.save()
+        self.assertEqual(send_counselor_weekly_digest(), [])
+
     def test_first_individual_tutoring_session_daily_digest(self):
         """
         python manage.py test snnotifications.tests.test_automated_notifications:TestTaskNotifications.test_first_individual_tutoring_session_daily_digest -s
@@ -202,12 +249,12 @@ class TestTaskNotifications(TestCase):
 class TestUserNotifications(TestCase):
     """ python manage.py test snnotifications.tests.test_automated_notifications:TestUserNotifications """
 
-    fixtures = ("fixture.json",)
+    @classmethod
+    def setUpTestData(cls):
+        # All we need from the DB is a (default) location for our student
+        Location.objects.create(name="Remote", is_remote=True)
 
     def setUp(self):
-        # Delete other students and parents
-        Student.objects.all().delete()
-        Parent.objects.all().delete()
         student_serializer = StudentSerializer(
             data={"email": "s@mail.com", "first_name": "Student", "last_name": "Name", "invite": True,}
         )
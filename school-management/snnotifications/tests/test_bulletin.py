@@ -176,6 +176,19 @@ class TestBulletinManager(TestCase):
         self.assertEqual(notis.filter(
             recipient=self.student.user.notification_recipient).count(), 2)
 
+        # Send to subset (queryset)
+        mgr.send_bulletin(notification_recipients=NotificationRecipient.objects.filter(
+            user=self.counselor.user))
+        self.assertEqual(Notification.objects.count(),
+                         noti_count + len(self.students) + 6)
+        self.assertEqual(notis.filter(
+            recipient=self.counselor.user.notification_recipient).count(), 3)
+
+        # No one to send to
+        self.assertEqual(mgr.send_bulletin(notification_recipients=[]), [])
+        self.assertEqual(Notification.objects.count(),
+                         noti_count + len(self.students) + 6)
+
     def test_get_bulletins_for_notification_recipient(self):
         self.bulletin.cap = self.bulletin.cas = True
         self.bulletin.save()
@@ -457,6 +470,12 @@ class TestBulletinViewset(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(json.loads(response.content)), 2)
 
+        # Admins can also get bulletins visible to other users
+        for param, pk in (("student", self.student.pk), ("parent", self.parent.pk), ("tutor", self.tutor.pk)):
+            response = self.client.get(f"{url}?{param}={pk}")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([x["pk"] for x in json.loads(response.content)], [bulletin_one.pk])
+
     def test_update(self):
         # Counselor can update visible_to_notification_recipients. Confirm sent noti
         bulletin_one = Bulletin.objects.create(created_by=self.counselor.user,)
@@ -3,6 +3,7 @@
 import json
 from datetime import timedelta
 
+from django.core.cache import cache
 from django.test import TestCase
 from django.shortcuts import reverse
 from django.contrib.contenttypes.models import ContentType
@@ -11,6 +12,7 @@ from django.utils import timezone
 from snusers.models import Student, Parent, Administrator, Tutor, Counselor
 from snnotifications.generator import create_notification
 from snnotifications.models import Notification
+from snnotifications.views.notification import SYSTEM_NOTIFICATIONS_CACHE_KEY
 from sncommon.utilities.magento import MagentoAPIManager, MagentoAPIManagerException
 from sntutoring.models import StudentTutoringSession
 from sntutoring.utilities.tutoring_package_manager import StudentTutoringPackagePurchaseManager
@@ -39,6 +41,8 @@ class TestActivityLogView(TestCase):
         self.student.save()
         self.student_url = reverse("activity_log_user", kwargs={"user_pk": self.student.user.pk})
         self.system_url = reverse("activity_log_system")
+        # System notifications cached by an earlier test would outlive its DB
+        cache.delete(SYSTEM_NOTIFICATIONS_CACHE_KEY)
 
     def test_authentication_failure(self):
         # Must be logged in
@@ -136,3 +140,9 @@ class TestActivityLogView(TestCase):
             self.assertTrue(x["slug"] == str(webhook_noti.slug) or x["slug"] == str(paygo_noti.slug))
             self.assertNotEqual(x["activity_log_title"], "")
             self.assertIn("activity_log_description", x)
+
+        # System notifications are cached, so new ones don't show up until cache expires
+        create_notification(None, notification_type="ops_magento_webhook", additional_args=payload)
+        self.assertEqual(len(json.loads(self.client.get(self.system_url).content)), 2)
+        cache.delete(SYSTEM_NOTIFICATIONS_CACHE_KEY)
+        self.assertEqual(len(json.loads(self.client.get(self.system_url).content)), 3)
@@ -4,11 +4,14 @@
 import json
 
 from django.test import TestCase
+from django.contrib.contenttypes.models import ContentType
 from django.core.files.base import ContentFile
 from django.shortcuts import reverse
 from django.urls.exceptions import NoReverseMatch
 from django.core import mail
 from snnotifications.mailer import send_email_for_notification
+from snnotifications.generator import create_notification
+from sntasks.models import Task
 
 from snusers.models import Student, Administrator, Parent
 from snnotifications.models import NotificationRecipient, Notification
@@ -40,11 +43,14 @@ class TestNotificationRecipientView(TestCase):
         # Can update as student
         self.assertEqual(self.student_recipient.phone_number_verification_code, "")
         self.client.force_login(self.student.user)
-        response = self.client.patch(url, json.dumps(data), content_type="application/json")
+        # Verification is sent (by celery) once update is committed
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(url, json.dumps(data), content_type="application/json")
         self.assertEqual(response.status_code, 200)
         result = json.loads(response.content)
         # Verification code should have been set (and sent, but we don't send texts in test mode)
         self.assertEqual(result["phone_number"], data["phone_number"])
+        self.assertFalse(result["phone_number_is_confirmed"])
         self.student_recipient.refresh_from_db()
         self.assertEqual(len(self.student_recipient.phone_number_verification_code), 5)
 
@@ -59,6 +65,16 @@ class TestNotificationRecipientView(TestCase):
         self.assertEqual(self.parent_recipient.phone_number, data["phone_number"])
         self.assertEqual(len(self.parent_recipient.phone_number_verification_code), 0)
 
+        # Phone numbers are stored as digits only
+        response = self.client.patch(
+            f"{url}?dont_send_verification=true",
+            json.dumps({"phone_number": "+1 (248) 565-6988"}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.parent_recipient.refresh_from_db()
+        self.assertEqual(self.parent_recipient.phone_number, "12485656988")
+
     def test_send_verification_code(self):
         self.assertEqual(self.student_recipient.phone_number_verification_code, "")
         self.assertIsNone(self.student_recipient.confirmation_last_sent)
@@ -73,7 +89,8 @@ class TestNotificationRecipientView(TestCase):
 
         # Success!
         self.client.force_login(self.student.user)
-        self.assertEqual(self.client.post(url).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(url).status_code, 200)
         self.student_recipient.refresh_from_db()
         self.assertEqual(len(self.student_recipient.phone_number_verification_code), 5)
         old_code = self.student_recipient.phone_number_verification_code
@@ -82,7 +99,8 @@ class TestNotificationRecipientView(TestCase):
 
         # Admin, too!
         self.client.force_login(self.admin.user)
-        self.assertEqual(self.client.post(url).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post(url).status_code, 200)
         self.student_recipient.refresh_from_db()
         self.assertEqual(len(self.student_recipient.phone_number_verification_code), 5)
         self.assertNotEqual(old_code, self.student_recipient.phone_number_verification_code)
@@ -153,3 +171,31 @@ class TestNotificationRecipientView(TestCase):
         )
         self.assertEqual(len(mail.outbox[1].cc), 1)
 
+    def test_subscription_sets_follow_changes(self):
+        self.assertEqual(self.student_recipient.subscription_sets, (frozenset(), frozenset()))
+        self.student_recipient.unsubscribed_email_notifications = ["task_digest"]
+        self.student_recipient.unsubscribed_text_notifications = ["student_task_reminder"]
+        email_unsubscribed, text_unsubscribed = self.student_recipient.subscription_sets
+        self.assertIn("task_digest", email_unsubscribed)
+        self.assertIn("student_task_reminder", text_unsubscribed)
+        # Unsaved changes are dropped by refresh_from_db
+        self.student_recipient.refresh_from_db()
+        self.assertEqual(self.student_recipient.subscription_sets, (frozenset(), frozenset()))
+
+    def test_parent_notified_when_student_unsubscribed(self):
+        self.student.parent = self.parent
+        self.student.save()
+        self.student_recipient.unsubscribed_email_notifications = ["task_diagnostic"]
+        self.student_recipient.save()
+        task = Task.objects.create(for_user=self.student.user, title="Diagnostic Task")
+        notification = create_notification(
+            self.student.user,
+            notification_type="task_diagnostic",
+            related_object_content_type=ContentType.objects.get_for_model(Task),
+            related_object_pk=task.pk,
+        )
+        self.assertEqual(notification.recipient, self.student_recipient)
+        self.assertIsNone(notification.emailed)
+        # Parent gets their own copy of the notification
+        parent_notification = self.parent_recipient.notifications.get(notification_type="task_diagnostic")
+        self.assertEqual(parent_notification.title, notification.title)
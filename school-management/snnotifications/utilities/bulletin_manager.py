@@ -1,15 +1,20 @@
 """ Manager for creating, filtering, and sending (as Notification) Bulletins
 """
-import itertools
 from django.utils import timezone
+from django.contrib.postgres.expressions import ArraySubquery
 from django.db.models.query import QuerySet
+from django.db.models import Exists, F, Func, OuterRef
 from django.db.models.query_utils import Q
 from django.contrib.contenttypes.models import ContentType
-from snnotifications.models import Bulletin, NotificationRecipient
-from snnotifications.generator import create_notification
+from snnotifications.models import Bulletin, Notification, NotificationRecipient
+from snnotifications.async_dispatch import deliver_many
+from snnotifications.generator import build_notifications
 from snnotifications.constants import notification_types
 from snusers.models import Parent, Student
 
+# Max number of notification recipient PKs send_bulletin filters on in one query
+RECIPIENT_PK_BATCH_SIZE = 1000
+
 
 class BulletinManager:
     bulletin: Bulletin = None
@@ -26,22 +31,53 @@ class BulletinManager:
             Note this is an async method that can be called with .delay() to be executed
             by Celery.
             Arguments:
-                notification_recipients: Optional list of notification recipients to send
-                    bulletin to. Must be a subset of self.bulletin.visible_to_notification_recipients
-
+                notification_recipients: Optional list (or queryset) of notification recipients to send
+                    bulletin to. Must be a subset of self.bulletin.visible_to_notification_recipients.
+                    If None, bulletin is sent to all of visible_to_notification_recipients. If empty, it's sent
+                    to no one
+            Returns list of PKs of created notifications
         """
+        if isinstance(notification_recipients, (list, tuple)) and not notification_recipients:
+            return []
         data = {
             "notification_type": notification_types.BULLETIN,
             "related_object_content_type": ContentType.objects.get_for_model(Bulletin),
             "related_object_pk": self.bulletin.pk,
         }
-        send_to_recipients = (
-            self.bulletin.visible_to_notification_recipients.filter(pk__in=[x.pk for x in notification_recipients])
-            if notification_recipients
-            else self.bulletin.visible_to_notification_recipients.all()
+        visible_recipients = self.bulletin.visible_to_notification_recipients.select_related("user")
+        if isinstance(notification_recipients, QuerySet):
+            # Filter with a subquery rather than evaluating notification_recipients
+            send_to_recipients = [visible_recipients.filter(pk__in=notification_recipients.values("pk"))]
+        elif notification_recipients is not None:
+            # Filter in batches so we never build a giant IN (...)
+            pks = [x.pk for x in notification_recipients]
+            send_to_recipients = [
+                visible_recipients.filter(pk__in=pks[i : i + RECIPIENT_PK_BATCH_SIZE])
+                for i in range(0, len(pks), RECIPIENT_PK_BATCH_SIZE)
+            ]
+        else:
+            send_to_recipients = [visible_recipients]
+        # Build all of the notifications, then save them in bulk and send them concurrently
+        notifications = []
+        for recipients in send_to_recipients:
+            for recipient in recipients.iterator(chunk_size=500):
+                notifications += build_notifications(recipient.user, **data)
+        return [x.pk for x in deliver_many(Notification.objects.hidden_bulk_create(notifications))]
+
+    def _add_visible_to_notification_recipients(self, notification_recipients: QuerySet):
+        """ Add notification_recipients (queryset) to self.bulletin.visible_to_notification_recipients.
+            Only their PKs are loaded, and they're inserted into the M2M through table in bulk (skipping any that
+            are already visible)
+        """
+        through = Bulletin.visible_to_notification_recipients.through
+        through.objects.bulk_create(
+            [
+                through(bulletin_id=self.bulletin.pk, notificationrecipient_id=pk)
+                for pk in notification_recipients.values_list("pk", flat=True)
+            ],
+            batch_size=1000,
+            ignore_conflicts=True,
         )
-        for recipient in send_to_recipients:
-            create_notification(recipient.user, **data)
 
     def set_visible_to_notification_recipients(self) -> Bulletin:
         """ Sets self.bulletin.visible_to_notification_recipients based off the value of filtering
@@ -55,7 +91,9 @@ class BulletinManager:
             Overwrites existing visible_to_notification_recipients
             Returns updated Bulletin
         """
-        self.bulletin.visible_to_notification_recipients.clear()
+        Bulletin.visible_to_notification_recipients.through.objects.filter(bulletin_id=self.bulletin.pk).delete()
+        # Everyone bulletin should be visible to, so we can find (and add) them all with one query
+        visible_to = Q()
         if self.bulletin.students or self.bulletin.parents:
             filter_kwargs = {}
             if self.bulletin.class_years and not self.bulletin.all_class_years:
@@ -79,31 +117,24 @@ class BulletinManager:
                 )
                 base_parents = Parent.objects.filter(students__in=base_students)
 
-            cap_students = base_students.exclude(counseling_student_types_list=[])
+            cap_students = base_students.filter(counseling_student_types_list__len__gt=0)
 
             if self.bulletin.students:
                 students = (
                     base_students.filter(**filter_kwargs) if self.bulletin.cas else cap_students.filter(**filter_kwargs)
                 ).distinct()
             if self.bulletin.parents:
-                parent_filter_kwargs = {}
-                for k, v in filter_kwargs.items():
-                    parent_filter_kwargs[f"students__{k}"] = v
-                parents = base_parents.filter(**parent_filter_kwargs)
+                parents = base_parents.filter(**{f"students__{k}": v for k, v in filter_kwargs.items()})
                 if not self.bulletin.cas:
                     parents = parents.filter(students__in=cap_students).distinct()
 
-            self.bulletin.visible_to_notification_recipients.add(
-                *NotificationRecipient.objects.filter(Q(user__student__in=students) | Q(user__parent__in=parents))
-            )
+            visible_to |= Q(user__student__in=students) | Q(user__parent__in=parents)
         if self.bulletin.tutors and hasattr(self.bulletin.created_by, "administrator"):
-            self.bulletin.visible_to_notification_recipients.add(
-                *NotificationRecipient.objects.filter(user__tutor__isnull=False)
-            )
+            visible_to |= Q(user__tutor__isnull=False)
         if self.bulletin.counselors and hasattr(self.bulletin.created_by, "administrator"):
-            self.bulletin.visible_to_notification_recipients.add(
-                *NotificationRecipient.objects.filter(user__counselor__isnull=False)
-            )
+            visible_to |= Q(user__counselor__isnull=False)
+        if visible_to:
+            self._add_visible_to_notification_recipients(NotificationRecipient.objects.filter(visible_to).distinct())
         return self.bulletin
 
     @staticmethod
@@ -112,9 +143,11 @@ class BulletinManager:
         """
         if hasattr(notification_recipient.user, "administrator"):
             return Bulletin.objects.all()
-        return Bulletin.objects.filter(
-            Q(created_by=notification_recipient.user) | Q(visible_to_notification_recipients=notification_recipient)
-        ).distinct()
+        # EXISTS rather than joining visible_to_notification_recipients, so we don't need to dedupe with DISTINCT
+        visible = Bulletin.visible_to_notification_recipients.through.objects.filter(
+            bulletin=OuterRef("pk"), notificationrecipient=notification_recipient
+        )
+        return Bulletin.objects.filter(Q(created_by=notification_recipient.user_id) | Exists(visible))
 
     @staticmethod
     def get_evergreen_bulletins_for_new_student(student: Student) -> QuerySet:
@@ -123,6 +156,7 @@ class BulletinManager:
         """
         if not (isinstance(student, Student)):
             raise ValueError("Attempting to get evergreen bulletins for non-student")
+        # Joining creator's counselor's students on a single student can't duplicate bulletins, so no DISTINCT
         return (
             Bulletin.objects.filter(evergreen=True, created_by__counselor__students=student, students=True)
             .filter(Q(evergreen_expiration=None) | Q(evergreen_expiration__gt=timezone.now()))
@@ -131,24 +165,27 @@ class BulletinManager:
                 Q(counseling_student_types__overlap=student.counseling_student_types_list)
                 | Q(all_counseling_student_types=True)
             )
-            .distinct()
         )
 
     @staticmethod
     def get_evergreen_bulletins_for_new_parent(parent: Parent) -> QuerySet:
         if not (isinstance(parent, Parent)):
             raise ValueError("Attempting to get evergreen bulletins for non-parent")
-        grad_years = list(parent.students.values_list("graduation_year", flat=True))
-        counseling_student_types_list = list(
-            itertools.chain(parent.students.values_list("counseling_student_types_list", flat=True))
+        # Parent's students' grad years and (all of their) counseling student types, as array subqueries so that
+        # everything is filtered in one query
+        grad_years = ArraySubquery(parent.students.values("graduation_year"))
+        counseling_student_types = ArraySubquery(
+            parent.students.annotate(
+                counseling_student_type=Func(F("counseling_student_types_list"), function="unnest")
+            ).values("counseling_student_type")
         )
-        counseling_student_types = [item for sublist in counseling_student_types_list for item in sublist]
+        # Created by the counselor of (at least) one of parent's students
+        counselor_of_parents_student = Student.objects.filter(counselor__user=OuterRef("created_by"), parent=parent)
         return (
-            Bulletin.objects.filter(evergreen=True, created_by__counselor__students__parent=parent, parents=True)
+            Bulletin.objects.filter(Exists(counselor_of_parents_student), evergreen=True, parents=True)
             .filter(Q(evergreen_expiration=None) | Q(evergreen_expiration__gt=timezone.now()))
             .filter(Q(class_years__overlap=grad_years) | Q(all_class_years=True))
             .filter(
                 Q(counseling_student_types__overlap=counseling_student_types) | Q(all_counseling_student_types=True)
             )
-            .distinct()
         )
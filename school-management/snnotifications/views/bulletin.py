@@ -1,3 +1,4 @@
+from django.db.models import Exists, OuterRef, Prefetch
 from django.shortcuts import get_object_or_404
 from rest_framework.decorators import action
 
@@ -8,10 +9,10 @@ from rest_framework.response import Response
 from snnotifications.models import Bulletin, NotificationRecipient
 from snnotifications.serializers import BulletinSerializer
 from snnotifications.utilities.bulletin_manager import BulletinManager
-from snusers.mixins import AccessStudentPermission
+from snusers.mixins import AccessStudentPermission, SelectUserRolesMixin
 
 
-class BulletinViewset(AccessStudentPermission, ModelViewSet):
+class BulletinViewset(SelectUserRolesMixin, AccessStudentPermission, ModelViewSet):
     """ Viewset with basic CRUD operations for a bulletin.
         List:
             Returns bulletins visible to current user or user specific by query params. Possible Query Params:
@@ -20,32 +21,65 @@ class BulletinViewset(AccessStudentPermission, ModelViewSet):
 
     serializer_class = BulletinSerializer
     permission_classes = (IsAuthenticated,)
+    # request.user.notification_recipient is used to filter bulletins and to mark them as read
+    user_select_related = ("notification_recipient",)
 
     def get_queryset(self):
+        # Whether each bulletin is visible to the current user (used by check_object_permissions)
+        queryset = self.get_bulletins().annotate(
+            visible_to_user=Exists(
+                Bulletin.visible_to_notification_recipients.through.objects.filter(
+                    bulletin=OuterRef("pk"), notificationrecipient__user=self.request.user
+                )
+            )
+        )
+        if hasattr(self.request.user, "administrator") or hasattr(self.request.user, "counselor"):
+            # Names of students and parents who have read each bulletin (admin/counselor only fields on serializer)
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    "read_notification_recipients",
+                    queryset=NotificationRecipient.objects.filter(user__student__isnull=False)
+                    .select_related("user__student")
+                    .only("user__student__invitation_name")
+                    .order_by("user__student__invitation_name"),
+                    to_attr="read_student_recipients",
+                ),
+                Prefetch(
+                    "read_notification_recipients",
+                    queryset=NotificationRecipient.objects.filter(user__parent__isnull=False)
+                    .select_related("user__parent")
+                    .only("user__parent__invitation_name")
+                    .order_by("user__parent__invitation_name"),
+                    to_attr="read_parent_recipients",
+                ),
+            )
+        return queryset
+
+    def get_bulletins(self):
         """ Filter queryset based on user-type query parameters listed in class docstring
             Also checks permissions to access user if specified
         """
         query_params = self.request.query_params
         notification_recipient = None
+        # We only need recipient's pk and user (to check whether they're an admin)
+        recipients = NotificationRecipient.objects.select_related("user").only("pk", "user")
         if query_params.get("student"):
-            notification_recipient = get_object_or_404(NotificationRecipient, user__student=query_params["student"])
+            notification_recipient = get_object_or_404(
+                recipients.select_related("user__student"), user__student=query_params["student"]
+            )
             if not self.has_access_to_student(notification_recipient.user.student):
                 self.permission_denied(self.request)
-            return BulletinManager.get_bulletins_for_notification_recipient(
-                notification_recipient.user.student.user.notification_recipient
-            )
+            return BulletinManager.get_bulletins_for_notification_recipient(notification_recipient)
         if any([x in query_params for x in ("tutor", "counselor", "parent")]):
             # Only admins can get bulletins for other users who aren't students
             if not hasattr(self.request.user, "administrator"):
                 self.permission_denied(self.request)
             if query_params.get("tutor"):
-                notification_recipient = get_object_or_404(NotificationRecipient, user__tutor=query_params["tutor"])
+                notification_recipient = get_object_or_404(recipients, user__tutor=query_params["tutor"])
             elif query_params.get("counselor"):
-                notification_recipient = get_object_or_404(
-                    NotificationRecipient, user__counselor=query_params["counselor"]
-                )
+                notification_recipient = get_object_or_404(recipients, user__counselor=query_params["counselor"])
             elif query_params.get("parent"):
-                notification_recipient = get_object_or_404(NotificationRecipient, user__parent=query_params["parent"])
+                notification_recipient = get_object_or_404(recipients, user__parent=query_params["parent"])
             return (
                 BulletinManager.get_bulletins_for_notification_recipient(notification_recipient)
                 if notification_recipient
@@ -70,7 +104,10 @@ class BulletinViewset(AccessStudentPermission, ModelViewSet):
         super().check_object_permissions(request, obj)
         if hasattr(request.user, "administrator") or obj.created_by == request.user:
             return True
-        if not obj.visible_to_notification_recipients.filter(user=request.user).exists():
+        visible = getattr(obj, "visible_to_user", None)
+        if visible is None:
+            visible = obj.visible_to_notification_recipients.filter(user=request.user).exists()
+        if not visible:
             self.permission_denied(request)
         if request.method.lower() == "post" and not self.kwargs.get("pk"):
             self.permission_denied(request)
@@ -87,6 +124,8 @@ class BulletinViewset(AccessStudentPermission, ModelViewSet):
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
         bulletin = serializer.save()
+        # created_by is request.user, whose roles have already been loaded (and are checked by BulletinManager)
+        bulletin.created_by = request.user
 
         # If the visible_to_notification_recipients field is included in data, then we don't need
         # to calculate which notification recipients this bulletin is visible to
@@ -1,7 +1,10 @@
+from django.core.cache import cache
 from django.http import HttpResponse
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, F, Q
 from rest_framework.viewsets import GenericViewSet
 from rest_framework.mixins import UpdateModelMixin, RetrieveModelMixin
 from rest_framework.permissions import IsAuthenticated
@@ -14,23 +17,24 @@ from rest_framework import status
 from snmessages.models import ConversationParticipant
 from snmessages.utilities.conversation_manager import ConversationManager
 from snnotifications.models import NotificationRecipient, Notification
-from snnotifications.serializers import NotificationRecipientSerializer, NotificationSerializer
+from snnotifications.serializers import CW_USER_RELATIONS, NotificationRecipientSerializer, NotificationSerializer
 from snnotifications.generator import create_notification
+from snnotifications.tasks import send_phone_number_verification
 from snnotifications.constants.constants import SYSTEM_NOTIFICATIONS
-from sncommon.utilities.twilio import TwilioManager
-from snusers.mixins import AccessStudentPermission
-from snusers.models import Student
+from snusers.mixins import AccessStudentPermission, SelectUserRolesMixin
 
 
-class CreateNotificationView(AccessStudentPermission, APIView):
+class CreateNotificationView(SelectUserRolesMixin, AccessStudentPermission, APIView):
     permission_classes = (IsAuthenticated,)
 
     def _send_diagnostic_invite(self, recipient: NotificationRecipient):
-        create_notification(recipient.user, notification_type="diagnostic_invite")
-        if not hasattr(recipient.user, "student"):
+        # recipient.user.student is selected by post
+        student = getattr(recipient.user, "student", None)
+        if not student:
             raise ValidationError("Recipient does not have a student profile")
-        if not self.has_access_to_student(recipient.user.student):
+        if not self.has_access_to_student(student):
             self.permission_denied(self.request)
+        create_notification(recipient.user, notification_type="diagnostic_invite")
         return Response()
 
     def post(self, request, notification_type, *args, **kwargs):
@@ -44,7 +48,9 @@ class CreateNotificationView(AccessStudentPermission, APIView):
                 recipient: PK of NotificationRecipient who will get notification.
                 ... Each notificaiton type can have it's own additional data
         """
-        recipient = get_object_or_404(NotificationRecipient, pk=request.data.get("recipient"))
+        recipient = get_object_or_404(
+            NotificationRecipient.objects.select_related("user__student"), pk=request.data.get("recipient")
+        )
         if notification_type == "diagnostic_invite":
             return self._send_diagnostic_invite(recipient)
         return Response(
@@ -52,7 +58,12 @@ class CreateNotificationView(AccessStudentPermission, APIView):
         )
 
 
-class ActivityLogView(AccessStudentPermission, APIView):
+# Serialized system notifications (ActivityLogView) are cached under this key for this many seconds
+SYSTEM_NOTIFICATIONS_CACHE_KEY = "admin_system_notifications"
+SYSTEM_NOTIFICATIONS_CACHE_TIMEOUT = 60
+
+
+class ActivityLogView(SelectUserRolesMixin, AccessStudentPermission, APIView):
     permission_classes = (IsAuthenticated,)
 
     def get(self, request, user_pk=None, *args, **kwargs):
@@ -65,13 +76,25 @@ class ActivityLogView(AccessStudentPermission, APIView):
         if not user_pk:
             if not hasattr(request.user, "administrator"):
                 self.permission_denied(request)
-            # System notifications!
+            # System notifications! Admins check these often, so they're cached briefly. The timeout is the only
+            # freshness guarantee: new system notifications can take up to SYSTEM_NOTIFICATIONS_CACHE_TIMEOUT to show up
             notifications = Notification.objects.filter(
                 recipient=None, notification_type__in=SYSTEM_NOTIFICATIONS
             ).exclude(activity_log_title="")
+            return Response(
+                cache.get_or_set(
+                    SYSTEM_NOTIFICATIONS_CACHE_KEY,
+                    lambda: list(self._serialize_activity_log(notifications)),
+                    SYSTEM_NOTIFICATIONS_CACHE_TIMEOUT,
+                )
+            )
         else:
-            user = get_object_or_404(User, pk=user_pk, notification_recipient__isnull=False)
-            student = Student.objects.filter(user=user).first()
+            user = get_object_or_404(
+                User.objects.select_related("student", "notification_recipient"),
+                pk=user_pk,
+                notification_recipient__isnull=False,
+            )
+            student = getattr(user, "student", None)
             # Must be admin or user or have access to student
             if not (
                 hasattr(request.user, "administrator")
@@ -82,10 +105,23 @@ class ActivityLogView(AccessStudentPermission, APIView):
             notifications = Notification.objects.filter(recipient=user.notification_recipient).exclude(
                 activity_log_title=""
             )
-        return Response(NotificationSerializer(notifications.order_by("-created")[:500], many=True).data)
+        return Response(self._serialize_activity_log(notifications))
+
+    def _serialize_activity_log(self, notifications):
+        """ Serialize most recent 500 of notifications """
+        # actor is used for NotificationSerializer.actor_name (recipient is only serialized as a PK). Only serialized
+        # fields are loaded (additional_args in particular can be large, i.e. for webhook notifications)
+        notifications = (
+            notifications.select_related("actor")
+            .only(*[x for x in NotificationSerializer.Meta.fields if x != "actor_name"])
+            .order_by("-created")[:500]
+        )
+        return NotificationSerializer(notifications, many=True).data
 
 
-class NotificationRecipientViewset(GenericViewSet, UpdateModelMixin, RetrieveModelMixin, AccessStudentPermission):
+class NotificationRecipientViewset(
+    SelectUserRolesMixin, GenericViewSet, UpdateModelMixin, RetrieveModelMixin, AccessStudentPermission
+):
     """ This viewset allows for:
         - Updating NotificationRecipient
         - Sending text verification code to NotificationRecipient
@@ -93,7 +129,16 @@ class NotificationRecipientViewset(GenericViewSet, UpdateModelMixin, RetrieveMod
         Arguments/return for each endpoint are described below
     """
 
-    queryset = NotificationRecipient.objects.all()
+    # Number of conversations with unread messages, for NotificationRecipientSerializer.unread_conversations
+    queryset = NotificationRecipient.objects.annotate(
+        unread_conversations=Count(
+            "participants",
+            filter=Q(
+                participants__conversation__last_message__isnull=False,
+                participants__last_read__lt=F("participants__conversation__last_message"),
+            ),
+        )
+    ).select_related(*[f"user__{x}" for x in CW_USER_RELATIONS])
     serializer_class = NotificationRecipientSerializer
     permission_classes = (IsAuthenticated,)
 
@@ -101,10 +146,9 @@ class NotificationRecipientViewset(GenericViewSet, UpdateModelMixin, RetrieveMod
         super(NotificationRecipientViewset, self).check_object_permissions(request, obj)
         if obj.user != request.user and not hasattr(request.user, "administrator"):
             # Check if notification rec is for student user has access to
+            # Student and parent are selected by queryset, and access to any of parent's students is one query
             access_student = hasattr(obj.user, "student") and self.has_access_to_student(obj.user.student)
-            access_parent = hasattr(obj.user, "parent") and any(
-                [self.has_access_to_student(x) for x in obj.user.parent.students.all()]
-            )
+            access_parent = hasattr(obj.user, "parent") and self.has_access_to_parent(obj.user.parent)
             if not (access_student or access_parent):
                 self.permission_denied(request)
 
@@ -125,16 +169,17 @@ class NotificationRecipientViewset(GenericViewSet, UpdateModelMixin, RetrieveMod
             obj.save()
             # Deacitvate ConversationParticipants for old phone number
             if og_obj.phone_number:
+                # Participants' numbers are the recipient's number prepended with '+'
                 participants = ConversationParticipant.objects.filter(
-                    active=True, phone_number__contains=og_obj.phone_number
+                    active=True, phone_number=f"+{og_obj.phone_number}"
                 )
                 if participants.exists():
-                    conversation_manager = ConversationManager()
-                    for participant in participants:
-                        conversation_manager.delete_conversation_participant(participant)
+                    ConversationManager().delete_conversation_participants(participants)
             if obj.phone_number and not self.request.query_params.get("dont_send_verification", False):
-                twilio_manager = TwilioManager()
-                twilio_manager.send_verification(obj)
+                # New code is set (and number unconfirmed) right away. Only the text is sent by celery, once update
+                # is committed, so a rolled back update doesn't send a code
+                obj.set_new_verification_code()
+                transaction.on_commit(lambda: send_phone_number_verification.delay(obj.pk))
         return obj
 
     @action(
@@ -146,8 +191,9 @@ class NotificationRecipientViewset(GenericViewSet, UpdateModelMixin, RetrieveMod
             Returns 200 upon success. No content in response
         """
         # Runs get_object_permissions
-        twilio_manager = TwilioManager()
-        twilio_manager.send_verification(self.get_object())
+        notification_recipient = self.get_object()
+        notification_recipient.set_new_verification_code()
+        transaction.on_commit(lambda: send_phone_number_verification.delay(notification_recipient.pk))
         return HttpResponse()
 
     @action(
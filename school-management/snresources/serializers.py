@@ -1,6 +1,3 @@
-from django.shortcuts import get_object_or_404
-from django.core.files.base import ContentFile
-
 from rest_framework import serializers
 from rest_framework.serializers import ValidationError
 
@@ -24,8 +21,9 @@ class ResourceSerializer(serializers.ModelSerializer):
     resource_group = serializers.PrimaryKeyRelatedField(queryset=ResourceGroup.objects.all(), required=False)
     resource_group_title = serializers.CharField(source="resource_group.title", read_only=True)
     link = serializers.CharField(required=False)
-    cap = serializers.SerializerMethodField()
-    cas = serializers.SerializerMethodField()
+    # From resource group (False if resource isn't in a group)
+    cap = serializers.BooleanField(source="resource_group.cap", read_only=True, default=False)
+    cas = serializers.BooleanField(source="resource_group.cas", read_only=True, default=False)
 
     # Use this field to update the resource's resource_file field. This field is only
     # writeable (not readable), and expects the slug for a FileUpload object
@@ -54,12 +52,6 @@ class ResourceSerializer(serializers.ModelSerializer):
             "vimeo_id",
         )
 
-    def get_cap(self, obj: Resource):
-        return obj.resource_group.cap if obj.resource_group else False
-
-    def get_cas(self, obj: Resource):
-        return obj.resource_group.cas if obj.resource_group else False
-
     def _save_file_upload(self, instance, file_upload):
         """ This utility method copies the file from a file_upload object
             to instance.resource_file field
@@ -71,30 +63,35 @@ class ResourceSerializer(serializers.ModelSerializer):
         """
         if not file_upload.file_resource:
             raise TypeError("FileUpload missing file_resource")
-        instance.resource_file.save(
-            name=file_upload.file_resource.name, content=ContentFile(file_upload.file_resource.read()),
-        )
+        # Storage copies the file in chunks, instead of us reading the whole file into memory
+        with file_upload.file_resource.open("rb") as file_resource:
+            instance.resource_file.save(name=file_upload.file_resource.name, content=file_resource)
         return instance
 
     def create(self, validated_data):
-        file_upload_slug = validated_data.pop("file_upload", None)
+        # FileUpload object (see validate)
+        file_upload = validated_data.pop("file_upload", None)
         instance = super(ResourceSerializer, self).create(validated_data)
-        if file_upload_slug:
-            instance = self._save_file_upload(instance, get_object_or_404(FileUpload, slug=file_upload_slug))
+        if file_upload:
+            instance = self._save_file_upload(instance, file_upload)
         return instance
 
     def update(self, instance, validated_data):
-        file_upload_slug = validated_data.pop("file_upload", None)
+        # FileUpload object (see validate), or "" to remove resource_file
+        file_upload = validated_data.pop("file_upload", None)
         instance = super(ResourceSerializer, self).update(instance, validated_data)
-        if file_upload_slug:
-            instance = self._save_file_upload(instance, get_object_or_404(FileUpload, slug=file_upload_slug))
-        elif file_upload_slug == "":
+        if file_upload:
+            instance = self._save_file_upload(instance, file_upload)
+        elif file_upload == "":
             instance.resource_file = ""
             instance.save()
         return instance
 
     def validate(self, attrs):
-        if attrs.get("file_upload") and not FileUpload.objects.filter(slug=attrs["file_upload"]).exists():
-            raise ValidationError("Invalid file upload object(s)")
+        # Replace file upload slug with the FileUpload, so create/update don't need to query for it again
+        if attrs.get("file_upload"):
+            attrs["file_upload"] = FileUpload.objects.filter(slug=attrs["file_upload"]).first()
+            if not attrs["file_upload"]:
+                raise ValidationError("Invalid file upload object(s)")
 
         return attrs
@@ -100,3 +100,53 @@ class TestResourcePermissionManager(TestCase):
         other_student.visible_resources.add(resource_one)
         # pylint: disable=expression-not-assigned
         [self._confirm_access(resource_one, x.user, False) for x in (self.student, self.parent)]
+
+    def test_parent_with_multiple_students(self):
+        """ Parents get access to resources visible to any of their students """
+        other_student = Student.objects.create(user=User.objects.create_user("otherstudent"), parent=self.parent)
+        resource_one = Resource.objects.create(link="google.com", title="Test")
+        resource_one.visible_students.add(self.student)
+        resource_two = Resource.objects.create(link="google.com", title="Test")
+        resource_two.visible_students.add(other_student)
+        resource_three = Resource.objects.create(link="google.com", title="Test")
+        self.assertEqual(
+            set(get_resources_for_user(self.parent.user).values_list("pk", flat=True)),
+            {resource_one.pk, resource_two.pk},
+        )
+        self._confirm_access(resource_two, self.parent.user, True)
+        self._confirm_access(resource_three, self.parent.user, False)
+
+    def test_get_resources_for_user_access_changes(self):
+        """ Resources for student (and their parent) reflect changes to resources right away """
+        resource = Resource.objects.create(link="google.com", title="Test")
+        self._confirm_access(resource, self.student.user, False)
+        self._confirm_access(resource, self.parent.user, False)
+        resource.visible_students.add(self.student)
+        self._confirm_access(resource, self.student.user, True)
+        self._confirm_access(resource, self.parent.user, True)
+        resource.archived = True
+        resource.save()
+        self._confirm_access(resource, self.student.user, False)
+        self.assertTrue(
+            get_resources_for_user(self.student.user, include_archived_resources=True).filter(pk=resource.pk).exists()
+        )
+
+    def test_get_resources_for_user_no_duplicates(self):
+        """ Resources attached to student through multiple relationships are only returned once """
+        resource = Resource.objects.create(link="google.com", title="Test")
+        resource.visible_students.add(self.student)
+        for title in ("One", "Two"):
+            Task.objects.create(for_user=self.student.user, title=title).resources.add(resource)
+        for user in (self.student.user, self.parent.user):
+            self.assertEqual(list(get_resources_for_user(user).values_list("pk", flat=True)), [resource.pk])
+
+    def test_cap_student_stock_cap_resources(self):
+        """ CAP students get access to stock resources in CAP groups """
+        cap_resource = Resource.objects.create(
+            link="google.com", title="Test", resource_group=ResourceGroup.objects.create(title="CAP", cap=True)
+        )
+        self._confirm_access(cap_resource, self.student.user, False)
+        self.student.counseling_student_types_list = ["Paygo"]
+        self.student.save()
+        self._confirm_access(cap_resource, self.student.user, True)
+        self._confirm_access(cap_resource, self.parent.user, True)
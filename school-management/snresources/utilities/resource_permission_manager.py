@@ -2,7 +2,7 @@
     Module with utilities for getting resources that a user has access to, including
     checking to see if user has access to a specific resource
 """
-from django.db.models import Q
+from django.db.models import Exists, OuterRef, Q
 
 from snusers.models import Student, Counselor, Tutor, Administrator, Parent, get_cw_user
 from snresources.models import Resource, ResourceGroup
@@ -10,6 +10,29 @@ from sntutoring.models import TutoringSessionNotes, Diagnostic
 from sntasks.models import Task
 
 
+def _student_resources_filter(student: Student) -> Q:
+    """ Filter (Q) for Resources that student has access to. See get_resources_for_user
+        Multi-valued relationships are checked with EXISTS subqueries, so there's one row per resource and
+        querysets using this filter don't need distinct()
+    """
+    groups = ResourceGroup.objects.filter(visible_students=student).values("pk")
+    big_filter = Q(
+        Exists(Student.visible_resources.through.objects.filter(resource=OuterRef("pk"), student=student))
+        | Exists(Task.objects.filter(for_user_id=student.user_id, resources=OuterRef("pk")))
+        | Exists(Diagnostic.objects.filter(tasks__for_user_id=student.user_id, resources=OuterRef("pk")))
+        | Exists(
+            TutoringSessionNotes.objects.filter(student_tutoring_sessions__student=student, resources=OuterRef("pk"))
+        )
+        # In group that is not stock that student has access to
+        | Q(resource_group__in=groups)
+    )
+    if student.counseling_student_types_list:
+        # Stock CAP resources. Subquery (like groups above) so outer query doesn't need to join resource groups
+        cap_groups = ResourceGroup.objects.filter(cap=True).values("pk")
+        big_filter = big_filter | Q(resource_group__in=cap_groups, created_by=None)
+    return big_filter
+
+
 def get_resources_for_user(user, include_archived_resources=False):
     """ Returns the set of resources that user has access to. Includes:
         - Public resources and resources in public groups
@@ -37,37 +60,20 @@ def get_resources_for_user(user, include_archived_resources=False):
     if isinstance(cwuser, Administrator):
         queryset = Resource.objects.all()
     elif isinstance(cwuser, Student):
-        # Students have access to all of
-        groups = list(ResourceGroup.objects.filter(visible_students=cwuser).values_list("pk", flat=True))
-        tasks = list(Task.objects.filter(for_user=user).values_list("pk", flat=True))
-        diagnostics = list(Diagnostic.objects.filter(tasks__in=tasks).values_list("pk", flat=True))
-        notes = list(
-            TutoringSessionNotes.objects.filter(student_tutoring_sessions__student=cwuser).values_list("pk", flat=True)
-        )
-        big_filter = Q(
-            Q(visible_students=cwuser)
-            | Q(tasks__in=tasks)
-            | Q(diagnostics__in=diagnostics)
-            | Q(tutoring_session_notes__in=notes)
-            # In group that is not stock that student has access to
-            | Q(resource_group__in=groups)
-        )
-        if cwuser.counseling_student_types_list:
-            big_filter = big_filter | Q(resource_group__cap=True, created_by=None)
-
-        queryset = Resource.objects.filter(big_filter).distinct()
+        queryset = Resource.objects.filter(_student_resources_filter(cwuser))
     elif isinstance(cwuser, Parent):
-        queryset = queryset.union(
-            *[get_resources_for_user(student.user) for student in cwuser.students.all()]
-        ).distinct()
+        # One query for resources any of parent's students have access to
+        students_filter = Q()
+        for student in cwuser.students.all():
+            students_filter |= _student_resources_filter(student)
+        if students_filter:
+            queryset = Resource.objects.filter(students_filter)
     elif isinstance(cwuser, Tutor) or isinstance(cwuser, Counselor):
         # Stock + Resources cwuser created + resources available to all students
-        stock_or_created = Resource.objects.filter(Q(is_stock=True) | Q(created_by=cwuser.user)).distinct()
         # Getting resources for all of their students is too much. Just return those that they created or are public
         # and we assume that they get resources for their student individually
-        queryset = queryset.union(stock_or_created)
+        queryset = Resource.objects.filter(Q(is_stock=True) | Q(created_by=cwuser.user))
 
     if not include_archived_resources:
-        return queryset.filter(archived=False).distinct()
-
-    return queryset.distinct()
+        queryset = queryset.filter(archived=False)
+    return queryset
@@ -97,15 +97,17 @@ class ResourceViewset(CSVMixin, ModelViewSet, AccessStudentPermission):
 
     def filter_queryset(self, queryset):
         """ See LIST details in viewset docstring """
+        # Resource group is serialized (title, cap, cas) for every resource
         if self.request.query_params.get("student"):
             student = get_object_or_404(Student, pk=self.request.query_params["student"])
-            return get_resources_for_user(student.user)
+            queryset = get_resources_for_user(student.user)
         elif hasattr(self.request.user, "administrator") and self.kwargs.get("pk"):
-            return Resource.objects.all()
+            queryset = Resource.objects.all()
         elif self.request.query_params.get("all"):
-            return Resource.objects.all()
-
-        return get_resources_for_user(self.request.user)
+            queryset = Resource.objects.all()
+        else:
+            queryset = get_resources_for_user(self.request.user)
+        return queryset.select_related("resource_group")
 
     def perform_create(self, serializer):
         """ Override create to set created_by """
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.5 on 2026-10-17 04:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sntasks', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('archived', None), ('completed', None)), fields=['due'], name='task_open_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('archived', None), ('completed', None)), fields=['assigned_time'], name='task_open_assigned_idx'),
+        ),
+    ]
@@ -3,6 +3,7 @@ from django.db.models import Q, JSONField
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.postgres.fields import ArrayField
 from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.functional import cached_property
 
 from sncommon.model_base import SNModel
 from sncounseling.models import Roadmap
@@ -92,31 +93,46 @@ class Task(SNModel):
     """ Incoming FK """
     # file_uploads > Many FileUpload
 
+    class Meta:
+        # Partial indexes for open (not archived or completed) tasks, for the reminder (due) and daily
+        # digest (assigned_time) celery tasks
+        indexes = [
+            models.Index(fields=["due"], condition=Q(archived=None, completed=None), name="task_open_due_idx"),
+            models.Index(
+                fields=["assigned_time"], condition=Q(archived=None, completed=None), name="task_open_assigned_idx"
+            ),
+        ]
+
     def __str__(self):
         return "%s: %s" % (self.for_user.get_full_name(), self.title)
 
+    def refresh_from_db(self, *args, **kwargs):
+        """ Also drop cached is_cap, as Django does for its own relation caches """
+        super().refresh_from_db(*args, **kwargs)
+        self.__dict__.pop("is_cap", None)
+
     @property
     def notifications(self):
         """ Returns all notifications with this task as their primary related obj.
             Useful for getting history of reminders for this task.
             EXCLUDES CC
         """
+        task_content_type = ContentType.objects.get_for_model(Task)
         return (
-            Notification.objects.filter(is_cc=False,)
+            Notification.lean.filter(is_cc=False,)
             .filter(
-                Q(related_object_content_type=ContentType.objects.get_for_model(Task), related_object_pk=self.pk,)
-                | Q(
-                    secondary_related_object_content_type=ContentType.objects.get_for_model(Task),
-                    secondary_related_object_pk=self.pk,
-                )
+                Q(related_object_content_type=task_content_type, related_object_pk=self.pk,)
+                | Q(secondary_related_object_content_type=task_content_type, secondary_related_object_pk=self.pk,)
             )
             .order_by("created")
         )
 
-    @property
+    @cached_property
     def is_cap(self):
-        """ Proxy for whether or not task is a counseling task """
-        return bool(self.task_template or (self.created_by and hasattr(self.created, "counselor")))
+        """ Proxy for whether or not task is a counseling task (created from a template or by a counselor).
+            Cached on the instance
+        """
+        return bool(self.task_template_id or (self.created_by_id and hasattr(self.created_by, "counselor")))
 
 
 class TaskTemplate(SNModel):
@@ -1,12 +1,15 @@
+from collections import defaultdict
 from datetime import timedelta
 from celery import shared_task
-from django.db.models import Q
+from django.db.models import Exists, OuterRef, Q
 from django.utils import timezone
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth.models import User
 from snnotifications.constants.constants import NOTIFICATION_TASK_DUE_IN_LESS_THAN_HOURS
 from snnotifications.constants.notification_types import STUDENT_TASK_REMINDER, TASK_DIGEST
-from snnotifications.generator import create_notification
+from snnotifications.async_dispatch import deliver_many
+from snnotifications.generator import build_notifications, create_notification
+from snnotifications.models import Notification
 from sntasks.models import Task
 
 MAX_REMINDER_HOURS = 23  # We'll at most notify users of tasks every this many hours
@@ -16,49 +19,68 @@ MAX_REMINDER_HOURS = 23  # We'll at most notify users of tasks every this many h
 def send_daily_task_digest():
     """ Celery task that sends users assigned new tasks a list of tasks that they were assigned in the last 24 hours
     """
-    # Not all tasks are visible to students/parents.
+    now = timezone.now()
+    # Not all tasks are visible to students/parents. Only FK/one to one relationships are filtered on, so each task is
+    # only returned once (no need for distinct)
     tasks = (
         Task.objects.filter(archived=None, completed=None)
         .filter(Q(visible_to_counseling_student=True) | Q(task_template=None, created_by__counselor=None))
-        .filter(assigned_time__gt=timezone.now() - timedelta(hours=24), assigned_time__lte=timezone.now())
-    ).distinct()
+        .filter(assigned_time__gt=now - timedelta(hours=24), assigned_time__lte=now)
+    )
+
+    # PKs of tasks for each user, with one query
+    task_pks_by_user = defaultdict(list)
+    for user_pk, task_pk in tasks.values_list("for_user_id", "pk"):
+        task_pks_by_user[user_pk].append(task_pk)
 
     users_assigned_tasks = (
-        User.objects.filter(tasks__in=tasks)
+        User.objects.filter(pk__in=task_pks_by_user.keys())
         .filter(Q(student__isnull=False) | Q(parent__isnull=False))
-        .exclude(
+        .select_related("student", "parent", "notification_recipient")
+        .filter(
             # Extra check to ensure users don't get more than one notification every 24 hours (we do sligntly less as
-            # the task can take a few minutes to run)
-            notification_recipient__notifications__notification_type=TASK_DIGEST,
-            notification_recipient__notifications__created__gt=timezone.now() - timedelta(hours=23),
+            # the task can take a few minutes to run). EXISTS subquery, so we don't join (and then dedupe) notifications
+            ~Exists(
+                Notification.objects.filter(
+                    recipient__user=OuterRef("pk"),
+                    notification_type=TASK_DIGEST,
+                    created__gt=now - timedelta(hours=23),
+                )
+            )
         )
-        .distinct()
     )
-    user_pks = [u.pk for u in users_assigned_tasks]
+    users_assigned_tasks = list(users_assigned_tasks)
+
+    # Digests are built for every user, saved at once and then emailed concurrently (instead of one at a time)
+    notifications = []
+    user_content_type = ContentType.objects.get_for_model(User)
     for user in users_assigned_tasks:
-        create_notification(
+        notifications += build_notifications(
             user,
             notification_type=TASK_DIGEST,
-            related_object_content_type=ContentType.objects.get_for_model(User),
+            related_object_content_type=user_content_type,
             related_object_pk=user.pk,
-            additional_args=list(tasks.filter(for_user=user).values_list("pk", flat=True)),
+            additional_args=task_pks_by_user[user.pk],
         )
-    return user_pks
+    deliver_many(Notification.objects.hidden_bulk_create(notifications))
+    return [u.pk for u in users_assigned_tasks]
 
 
 @shared_task
 def send_student_task_reminders():
     """ Celery task to send overdue AND upcoming task notifications to students
     """
+    now = timezone.now()
     return_tasks = []
 
     # Overdue incomplete tasks visible to student that we haven't sent a reminder for in over 48 hours
+    # (like coming due tasks, only FK/one to one relationships are filtered on so no need for distinct)
     overdue_tasks = (
-        Task.objects.filter(due__lt=timezone.now(), archived=None, completed=None,)
+        Task.objects.filter(due__lt=now, archived=None, completed=None,)
         .exclude(task_template__counseling_parent_task=True)
         .exclude(for_user__student__has_access_to_cap=False)
         .filter(
-            Q(last_reminder_sent__lt=(timezone.now() - timedelta(hours=MAX_REMINDER_HOURS)))
+            Q(last_reminder_sent__lt=(now - timedelta(hours=MAX_REMINDER_HOURS)))
             | Q(last_reminder_sent=None)
         )
         .filter(
@@ -66,22 +88,21 @@ def send_student_task_reminders():
             Q(visible_to_counseling_student=True)
             | Q(task_template=None, created_by__counselor=None)
         )
-        .distinct()
     )
 
     # Tasks due in the next 48 hours that we haven't sent a reminder for in over 24 hours (
     # guard against too many reminders)
     coming_due_tasks = (
         Task.objects.filter(
-            due__gt=timezone.now(),
+            due__gt=now,
             archived=None,
             completed=None,
-            due__lt=timezone.now() + timedelta(hours=NOTIFICATION_TASK_DUE_IN_LESS_THAN_HOURS),
+            due__lt=now + timedelta(hours=NOTIFICATION_TASK_DUE_IN_LESS_THAN_HOURS),
         )
         .exclude(task_template__counseling_parent_task=True)
         .exclude(for_user__student__has_access_to_cap=False)
         .filter(
-            Q(last_reminder_sent__lt=(timezone.now() - timedelta(hours=MAX_REMINDER_HOURS)))
+            Q(last_reminder_sent__lt=(now - timedelta(hours=MAX_REMINDER_HOURS)))
             | Q(last_reminder_sent=None)
         )
         .filter(
@@ -89,27 +110,37 @@ def send_student_task_reminders():
             Q(visible_to_counseling_student=True)
             | Q(task_template=None, created_by__counselor=None)
         )
-        .distinct()
     )
-    tasks_queryset = (overdue_tasks | coming_due_tasks).distinct()
-    tasks = list(tasks_queryset)
-    users = User.objects.filter(tasks__in=tasks).distinct()
-
-    for user in users:
-        overdue = list(overdue_tasks.filter(for_user=user).values_list("pk", flat=True))
-        coming_due = list(coming_due_tasks.filter(for_user=user).values_list("pk", flat=True))
-        if overdue or coming_due:
-            notification = create_notification(
-                user,
-                **{
-                    "notification_type": STUDENT_TASK_REMINDER,
-                    "additional_args": {"overdue": overdue, "coming_due": coming_due},
-                },
-            )
+    # PKs of overdue and coming due tasks for each user (one query each)
+    overdue_by_user = defaultdict(list)
+    for user_pk, task_pk in overdue_tasks.values_list("for_user_id", "pk"):
+        overdue_by_user[user_pk].append(task_pk)
+    coming_due_by_user = defaultdict(list)
+    for user_pk, task_pk in coming_due_tasks.values_list("for_user_id", "pk"):
+        coming_due_by_user[user_pk].append(task_pk)
+    # Relations create_notification uses are selected up front
+    users = User.objects.filter(pk__in=set(overdue_by_user) | set(coming_due_by_user)).select_related(
+        "student", "parent", "notification_recipient"
+    )
 
-            if notification.emailed or notification.texted:
-                # Note that these tasks will no longer be in tasks_queryset, but they will be in tasks
-                return_tasks += overdue + coming_due
-                tasks_queryset.filter(for_user=user).update(last_reminder_sent=timezone.now())
+    try:
+        for user in users:
+            overdue = overdue_by_user[user.pk]
+            coming_due = coming_due_by_user[user.pk]
+            if overdue or coming_due:
+                notification = create_notification(
+                    user,
+                    **{
+                        "notification_type": STUDENT_TASK_REMINDER,
+                        "additional_args": {"overdue": overdue, "coming_due": coming_due},
+                    },
+                )
 
+                if notification.emailed or notification.texted:
+                    return_tasks += overdue + coming_due
+    finally:
+        # Tasks users were reminded of, in one query. Even if a notification fails partway through, so users who
+        # were already reminded aren't reminded again on the next run
+        if return_tasks:
+            Task.objects.filter(pk__in=return_tasks).update(last_reminder_sent=now)
     return return_tasks
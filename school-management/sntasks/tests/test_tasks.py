@@ -4,7 +4,8 @@
 from datetime import timedelta
 from django.utils import timezone
 from django.test import TestCase
-from snusers.models import Student
+from django.contrib.auth.models import User
+from snusers.models import Counselor, Student
 from snnotifications.models import Notification
 from sntasks.models import Task, TaskTemplate
 from sntasks.tasks import send_daily_task_digest
@@ -60,3 +61,12 @@ class TestTaskDigest(TestCase):
         noti.save()
         self.assertEqual(len(send_daily_task_digest()), 1)
         self.assertEqual(len(send_daily_task_digest()), 0)
+
+    def test_is_cap(self):
+        """ Tasks created from a template or by a counselor are CAP tasks """
+        counselor = Counselor.objects.create(user=User.objects.create_user("taskcounselor"))
+        self.assertFalse(Task.objects.create(for_user=self.student.user, title="Test").is_cap)
+        task = Task.objects.create(for_user=self.student.user, created_by=counselor.user, title="Test")
+        self.assertTrue(task.is_cap)
+        task_template = TaskTemplate.objects.create(title="Test Template")
+        self.assertTrue(Task.objects.create(for_user=self.student.user, task_template=task_template).is_cap)
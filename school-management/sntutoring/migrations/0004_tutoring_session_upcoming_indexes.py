@@ -0,0 +1,21 @@
+# Generated by Django 4.2.5 on 2026-10-17 03:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sntutoring', '0003_diagnosticresult_recommendation_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='grouptutoringsession',
+            index=models.Index(condition=models.Q(('cancelled', False)), fields=['start'], name='gts_upcoming_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studenttutoringsession',
+            index=models.Index(condition=models.Q(('is_tentative', False), ('missed', False), ('set_cancelled', False)), fields=['start'], name='sts_upcoming_idx'),
+        ),
+    ]
@@ -318,6 +318,12 @@ class GroupTutoringSession(SNModel):
     # time_card_line_items > many TutorTimeCardLineItem
     # courses > many Course
 
+    class Meta:
+        indexes = [
+            # Upcoming sessions (i.e. for reminders)
+            models.Index(fields=["start"], condition=models.Q(cancelled=False), name="gts_upcoming_idx"),
+        ]
+
     def __str__(self):
         if not self.start:
             return self.title
@@ -510,6 +516,16 @@ class StudentTutoringSession(SNModel):
     # tutoring_session_notes
     # time_card_line_items > many TutorTimeCardLineItem
 
+    class Meta:
+        indexes = [
+            # Upcoming sessions that will actually take place (i.e. for reminders)
+            models.Index(
+                fields=["start"],
+                condition=models.Q(missed=False, set_cancelled=False, is_tentative=False),
+                name="sts_upcoming_idx",
+            ),
+        ]
+
     def __str__(self):
         if not self.start:
             return ""
@@ -1,6 +1,7 @@
 """
     View Mixins related to users and authentication
 """
+from django.contrib.auth.models import User
 from django.db.models import Q
 
 from snusers.models import Parent, Student
@@ -9,6 +10,12 @@ from snusers.models import Parent, Student
 class AccessStudentPermission:
     """ Mixin that adds has_access_to_student(student) method """
 
+    def _accessible_students(self, user):
+        """ Students that (non-admin) user has access to """
+        return Student.objects.filter(
+            Q(Q(user=user) | Q(counselor__user=user) | Q(tutors__user=user) | Q(parent__user=user))
+        )
+
     def has_access_to_student(self, student, request=None):
         request = request or self.request
         if not (request.user and request.user.is_authenticated):
@@ -16,27 +23,37 @@ class AccessStudentPermission:
 
         if hasattr(request.user, "administrator"):
             return True
-        return (
-            Student.objects.filter(pk=student.pk)
-            .filter(
-                Q(
-                    Q(user=request.user)
-                    | Q(counselor__user=request.user)
-                    | Q(tutors__user=request.user)
-                    | Q(parent__user=request.user)
-                )
-            )
-            .exists()
-        )
+        return self._accessible_students(request.user).filter(pk=student.pk).exists()
 
     def has_access_to_parent(self, parent: Parent, request=None):
+        """ Whether or not user has access to any of parent's students. One query, regardless of how many
+            students parent has
+        """
         request = request or self.request
         if not (request.user and request.user.is_authenticated):
             return None
 
         if hasattr(request.user, "administrator"):
             return True
-        return any([self.has_access_to_student(x) for x in parent.students.all()])
+        return self._accessible_students(request.user).filter(parent=parent).exists()
+
+
+class SelectUserRolesMixin:
+    """ Mixin for DRF views that loads request.user along with all of their cw user relations (administrator,
+        counselor, etc.) in one query before permissions are checked. Then hasattr(request.user, "administrator")
+        and friends don't each query the DB
+    """
+
+    user_role_relations = ("administrator", "counselor", "tutor", "parent", "student")
+    # Any other (one to one) relations of request.user that the view uses
+    user_select_related = ()
+
+    def initial(self, request, *args, **kwargs):
+        if request.user and request.user.is_authenticated:
+            request.user = User.objects.select_related(*self.user_role_relations, *self.user_select_related).get(
+                pk=request.user.pk
+            )
+        super().initial(request, *args, **kwargs)
 
 
 class UserPermissionsHelpers:
@@ -70,8 +70,9 @@ class StudentManager(UserManagerBase):
         student, created = cls.create_user(invite=invite, **kwargs)
         # We set visible bulletins on student
         if created:
+            # Just the PKs - bulletins' (HTML) content can be large
             student.user.notification_recipient.bulletins.add(
-                *list(BulletinManager.get_evergreen_bulletins_for_new_student(student))
+                *BulletinManager.get_evergreen_bulletins_for_new_student(student).values_list("pk", flat=True)
             )
             # If we created student with a parent, we need to set bulletins on that parent
             if student.parent:
@@ -187,7 +188,7 @@ class ParentManager(UserManagerBase):
     def set_evergreen_bulletins(self) -> Parent:
         """ Set evergreen bulletins on a parent. Ideally after their students have been assigned ;) """
         self.parent.user.notification_recipient.bulletins.add(
-            *list(BulletinManager.get_evergreen_bulletins_for_new_parent(self.parent))
+            *BulletinManager.get_evergreen_bulletins_for_new_parent(self.parent).values_list("pk", flat=True)
         )
         return self.parent
 